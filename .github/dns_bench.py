@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+dns_bench.py
+
+Offline throughput benchmark for dns_explorer.
+
+Starts a local stub DNS server on 127.0.0.1 that is authoritative for a
+synthetic zone, runs a subdomain enumeration against it and reports
+queries/sec, p50/p99 query latency and peak RSS. Nothing leaves the box,
+so results are comparable from run to run on the same laptop. Every engine
+runs with wildcard filtering on, as dns_explorer does by default, and the
+run is flagged if it did not find exactly the hosts the zone holds.
+
+The stub can be made to misbehave like a real upstream:
+- --latency / --jitter : per-response delay
+- --loss               : fraction of queries silently dropped
+- --hit-ratio          : fraction of labels that are real hosts
+- --nxdomain-ratio     : fraction answered NXDOMAIN (the rest are NODATA)
+- --wildcard           : the zone has a *.zone record, so every name that
+                         would be NXDOMAIN answers the wildcard IP instead
+
+    python3 dns_bench.py --words 20000 --engine pipelined --concurrency 500
+
+Requires:  pip install dnspython
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import resource
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import FrozenSet, List, Optional
+
+import dns.asyncresolver
+import dns.exception
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+import dns_explorer
+
+
+ENGINES = ("resolver", "pipelined", "sharded")
+
+# Labels of the synthetic wordlist (w0, w1, ...); see main()
+SYNTHETIC_LABEL = re.compile(r"w\d+")
+
+
+# ---------- Synthetic zone ---------- #
+
+@dataclass
+class StubZone:
+    """
+    Deterministic fake zone: whether a label exists depends only on a hash
+    of the label, so the benchmark knows exactly how many hits to expect.
+    Only wordlist labels can exist: those in `labels`, or with labels None
+    the synthetic w<N> names. Anything else, such as the random labels
+    WildcardFilter probes with, is NXDOMAIN.
+
+    With `wildcard` the zone also holds *.origin, as a real wildcard zone
+    does: names that exist (hits, NODATA) answer for themselves and every
+    other name, random probe labels included, answers the wildcard IP.
+    """
+
+    origin: str = "bench.test"
+    hit_ratio: float = 0.05
+    nxdomain_ratio: float = 0.9
+    wildcard: bool = False
+    labels: Optional[FrozenSet[str]] = None
+    ttl: int = 300
+    wildcard_ip: str = "10.255.255.254"
+
+    def classify(self, label: str) -> str:
+        """
+        "hit", "wildcard", "nxdomain" or "nodata".
+        """
+        label = label.lower()
+        if self.labels is not None:
+            listed = label in self.labels
+        else:
+            listed = SYNTHETIC_LABEL.fullmatch(label) is not None
+        if not listed:
+            return "wildcard" if self.wildcard else "nxdomain"
+        digest = hashlib.blake2b(label.encode(), digest_size=8).digest()
+        x = int.from_bytes(digest, "big") / 2 ** 64
+        if x < self.hit_ratio:
+            return "hit"
+        x -= self.hit_ratio
+        if x < self.nxdomain_ratio:
+            return "wildcard" if self.wildcard else "nxdomain"
+        return "nodata"
+
+    @staticmethod
+    def host_ip(label: str) -> str:
+        digest = hashlib.blake2b(label.lower().encode(), digest_size=3).digest()
+        return "10.{}.{}.{}".format(*digest)
+
+    def respond(self, query: dns.message.Message) -> dns.message.Message:
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        question = query.question[0]
+        name = question.name.to_text().lower()
+        origin = self.origin.rstrip(".") + "."
+
+        if name.endswith(".in-addr.arpa.") and question.rdtype == dns.rdatatype.PTR:
+            host = "ptr-" + name.split(".in-addr.arpa.")[0].replace(".", "-")
+            response.answer.append(
+                dns.rrset.from_text(name, self.ttl, "IN", "PTR", f"{host}.{origin}")
+            )
+            return response
+
+        if not name.endswith("." + origin):
+            response.set_rcode(dns.rcode.REFUSED)
+            return response
+
+        label = name[: -len(origin) - 1]
+        kind = self.classify(label)
+        if kind == "nxdomain":
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        if kind in ("nxdomain", "nodata") or question.rdtype != dns.rdatatype.A:
+            response.authority.append(
+                dns.rrset.from_text(
+                    origin, self.ttl, "IN", "SOA",
+                    f"ns.{origin} hostmaster.{origin} 1 3600 600 86400 60",
+                )
+            )
+            return response
+
+        ip = self.host_ip(label) if kind == "hit" else self.wildcard_ip
+        response.answer.append(dns.rrset.from_text(name, self.ttl, "IN", "A", ip))
+        return response
+
+
+# ---------- Stub server ---------- #
+
+class _StubProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "StubServer") -> None:
+        self.server = server
+        self.transport: Optional[asyncio.DatagramTransport] = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        server = self.server
+        server.received += 1
+        if server.loss and random.random() < server.loss:
+            server.dropped += 1
+            return
+        try:
+            query = dns.message.from_wire(data)
+        except dns.exception.DNSException:
+            return
+        wire = server.zone.respond(query).to_wire()
+
+        delay = server.latency
+        if server.jitter:
+            delay += random.uniform(0, server.jitter)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.transport.sendto, wire, addr)
+        else:
+            self.transport.sendto(wire, addr)
+
+
+class StubServer:
+    """
+    UDP stub server for a StubZone, on its own event loop thread.
+
+        with StubServer(StubZone(), latency=0.005) as stub:
+            print(stub.address)   # "127.0.0.1:40123"
+    """
+
+    def __init__(
+        self,
+        zone: StubZone,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        loss: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.zone = zone
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.host = host
+        self.port = port
+        self.received = 0
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._udp: Optional[asyncio.DatagramTransport] = None
+
+    @property
+    def address(self) -> str:
+        return f"{self.host}:{self.port}"
+
+    def start(self) -> "StubServer":
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="dns-stub", daemon=True
+        )
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+        return self
+
+    async def _open(self) -> None:
+        self._udp, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _StubProtocol(self), local_addr=(self.host, self.port)
+        )
+        self.port = self._udp.get_extra_info("sockname")[1]
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._udp.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = None
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+# ---------- Latency capture ---------- #
+
+class _TimedTransport(dns_explorer.DNSTransport):
+    """
+    DNSTransport that records the client-side latency of every query.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+
+    async def query(self, name: str, rdtype: str = "A") -> dns.message.Message:
+        started = time.perf_counter()
+        try:
+            return await super().query(name, rdtype)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+class _TimedResolver(dns.asyncresolver.Resolver):
+    """
+    dns.asyncresolver.Resolver that records the latency of every resolve().
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.latencies: List[float] = []
+
+    async def resolve(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().resolve(*args, **kwargs)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak RSS of this process plus reaped children (sharded workers), in MB.
+    """
+    scale = 1024 if sys.platform != "darwin" else 1  # ru_maxrss: KB on Linux, bytes on macOS
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(max(own, children) / (1024 * 1024), 1)
+
+
+# ---------- Benchmark run ---------- #
+
+@dataclass
+class BenchResult:
+    engine: str
+    candidates: int
+    expected_hits: int
+    found: int
+    queries: int
+    dropped: int
+    seconds: float
+    qps: float
+    p50_ms: Optional[float]
+    p99_ms: Optional[float]
+    peak_rss_mb: float
+
+    @property
+    def exact(self) -> bool:
+        """
+        Found every host and nothing else (wildcard echoes all dropped).
+        """
+        return self.found == self.expected_hits
+
+
+def run_benchmark(
+    zone: StubZone,
+    words: List[str],
+    engine: str = "pipelined",
+    concurrency: int = 200,
+    workers: int = 0,
+    timeout: float = 1.0,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    loss: float = 0.0,
+    do_reverse: bool = False,
+) -> BenchResult:
+    """
+    Enumerate `words` under `zone` with the chosen engine against a fresh
+    stub server and measure it.
+
+    The sharded engine's workers report latency through QueryStats, so its
+    p50/p99 are histogram bucket upper bounds rather than exact samples.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine: {engine!r}")
+
+    expected = sum(1 for w in words if zone.classify(w) == "hit")
+    latencies: List[float] = []
+    p50 = p99 = None
+
+    with StubServer(zone, latency=latency, jitter=jitter, loss=loss) as stub:
+        started = time.perf_counter()
+
+        if engine == "sharded":
+            stats = dns_explorer.QueryStats()
+            found = sum(
+                1
+                for _ in dns_explorer.iter_subdomain_search_sharded(
+                    zone.origin,
+                    words,
+                    workers=workers,
+                    nums=False,
+                    do_reverse=do_reverse,
+                    concurrency=concurrency,
+                    timeout=timeout,
+                    nameserver=stub.address,
+                    pipelined=True,
+                    filter_wildcards=True,
+                    stats=stats,
+                )
+            )
+            p50, p99 = stats.percentile(50), stats.percentile(99)
+        elif engine == "pipelined":
+            with _TimedTransport(stub.address, timeout=timeout) as transport:
+                records = asyncio.run(
+                    dns_explorer.subdomain_search_async(
+                        zone.origin,
+                        words,
+                        nums=False,
+                        do_reverse=do_reverse,
+                        concurrency=concurrency,
+                        transport=transport,
+                        wildcards=dns_explorer.WildcardFilter(),
+                    )
+                )
+            found = len(records)
+            latencies = transport.latencies
+        else:
+            async def run_resolver() -> List[dns_explorer.DNSRecord]:
+                resolver = _TimedResolver(configure=False)
+                host, resolver.port = dns_explorer.split_nameserver(stub.address)
+                resolver.nameservers = [host]
+                resolver.timeout = resolver.lifetime = timeout
+                records = await dns_explorer.search_candidates_async(
+                    dns_explorer.iter_candidates(zone.origin, words, nums=False),
+                    do_reverse=do_reverse,
+                    concurrency=concurrency,
+                    resolver=resolver,
+                    wildcards=dns_explorer.WildcardFilter(),
+                )
+                latencies.extend(resolver.latencies)
+                return records
+
+            found = len(asyncio.run(run_resolver()))
+
+        seconds = time.perf_counter() - started
+        queries, dropped = stub.received, stub.dropped
+
+    if engine != "sharded":
+        p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 2)
+
+    return BenchResult(
+        engine=engine,
+        candidates=len(words),
+        expected_hits=expected,
+        found=found,
+        queries=queries,
+        dropped=dropped,
+        seconds=round(seconds, 3),
+        qps=round(queries / seconds, 1) if seconds else 0.0,
+        p50_ms=ms(p50),
+        p99_ms=ms(p99),
+        peak_rss_mb=peak_rss_mb(),
+    )
+
+
+# ---------- CLI ---------- #
+
+def main() -> None:
+    import argparse
+    parser = argparse.ArgumentParser(description="Offline dns_explorer benchmark")
+    parser.add_argument("--words", type=int, default=20000, help="Synthetic labels to try")
+    parser.add_argument(
+        "-w", "--wordlist", help="Use this wordlist instead of synthetic labels"
+    )
+    parser.add_argument("--engine", choices=ENGINES, default="pipelined")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument(
+        "--workers", type=int, default=0, help="Processes for --engine sharded (0 = CPUs)"
+    )
+    parser.add_argument("--timeout", type=float, default=1.0, help="Per-query timeout (s)")
+    parser.add_argument("--reverse", action="store_true", help="Include the PTR phase")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub response delay (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay (s)")
+    parser.add_argument("--loss", type=float, default=0.0, help="Fraction of queries dropped")
+    parser.add_argument("--hit-ratio", type=float, default=0.05)
+    parser.add_argument("--nxdomain-ratio", type=float, default=0.9)
+    parser.add_argument(
+        "--wildcard", action="store_true", help="Give the zone a *.zone wildcard record"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    if args.wordlist:
+        words = list(dns_explorer.iter_wordlist(args.wordlist))
+    else:
+        words = [f"w{i}" for i in range(args.words)]
+    zone = StubZone(
+        hit_ratio=args.hit_ratio,
+        nxdomain_ratio=args.nxdomain_ratio,
+        wildcard=args.wildcard,
+        labels=frozenset(w.lower() for w in words) if args.wordlist else None,
+    )
+
+    result = run_benchmark(
+        zone,
+        words,
+        engine=args.engine,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        timeout=args.timeout,
+        latency=args.latency,
+        jitter=args.jitter,
+        loss=args.loss,
+        do_reverse=args.reverse,
+    )
+
+    if args.json:
+        print(json.dumps(asdict(result), indent=2))
+    else:
+        for field, value in asdict(result).items():
+            print(f"{field:14} {value}")
+
+    if not result.exact:
+        print(
+            f"[!] found {result.found} records, expected {result.expected_hits}",
+            file=sys.stderr,
+        )
+        if not args.loss:
+            sys.exit(1)  # nothing was dropped, so this is a real miss
+
+
+if __name__ == "__main__":
+    main()
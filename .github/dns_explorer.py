@@ -9,115 +9,2932 @@ Implements what you sketched as:
 - (b) subdomainSearch(domain, dictionary, nums)
 - (c) DNS request + reverse DNS print
 - (d) reverseDNS(ip)
+- (e) asyncio engine that keeps many queries in flight at once
+- (f) pipelined raw transport: thousands of queries over one UDP socket,
+      optionally spread over several resolvers with AIMD rate control
+- (g) TTL-aware LRU cache for forward and reverse answers
+- (h) streaming output: table / NDJSON / CSV, one line per record
+- (i) reverse lookups as their own deduplicated, batched PTR phase
+- (j) multi-process sharding for very large wordlists
+- (k) wildcard-zone detection so *.domain answers don't count as hits
+- (l) lazy candidate generation: mmap'd wordlist, mutation rules, Bloom dedupe
+- (m) checkpoint / resume for long runs
+- (n) per-query instrumentation: latency histogram, outcome counters
+- (o) SQLite result store with new / vanished / changed diffs between runs
+- (p) multi-domain batches sharing one resolver pool and cache
+- (q) A / AAAA / CNAME resolution with shared CNAME-chain lookups
+- (r) slotted records and a compact columnar result table
 
 Requires:  pip install dnspython
 """
 
 from __future__ import annotations
 
-import socket
-from dataclasses import dataclass
-from typing import Iterable, List, Tuple
+import asyncio
+import bisect
+import csv
+import hashlib
+import ipaddress
+import itertools
+import json
+import math
+import mmap
+import os
+import secrets
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Union,
+)
 
-import dns.resolver
+import dns.asyncquery
+import dns.asyncresolver
+import dns.entropy
 import dns.exception
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.reversename
+
+
+# Errors that just mean "nothing usable came back for this name".
+RESOLVE_ERRORS = (
+    dns.resolver.NXDOMAIN,
+    dns.resolver.NoAnswer,
+    dns.resolver.NoNameservers,
+    dns.exception.Timeout,
+    dns.resolver.LifetimeTimeout,
+)
+
+# Per-name failures that aren't an answer at all: a name dnspython
+# refuses to build (LabelTooLong, EmptyLabel, ...) or a socket error on
+# the TCP fallback. Counted as "error" and never cached; the run goes on.
+LOOKUP_FAILURES = (dns.exception.DNSException, OSError)
+
+
+# ---------- (f) Pipelined UDP transport ---------- #
+
+class _PipelineProtocol(asyncio.DatagramProtocol):
+    """
+    Hands each incoming datagram to whichever query owns its transaction ID.
+    """
+
+    def __init__(self, pending: Dict[int, asyncio.Future]) -> None:
+        self.pending = pending
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        if len(data) < 12:
+            return
+        fut = self.pending.get(int.from_bytes(data[:2], "big"))
+        if fut is not None and not fut.done():
+            fut.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        # ICMP unreachable and friends: the retransmit timer deals with it.
+        pass
+
+
+def split_nameserver(spec: str, default_port: int = 53) -> Tuple[str, int]:
+    """
+    "1.1.1.1", "127.0.0.1:5353", "[::1]:5353" or "::1" -> (host, port).
+    """
+    if spec.startswith("["):
+        host, _, rest = spec[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else default_port
+    if spec.count(":") == 1:
+        host, port = spec.split(":")
+        return host, int(port)
+    return spec, default_port
+
+
+class _Upstream:
+    """
+    One resolver endpoint: its UDP socket, outstanding transaction IDs and
+    health stats (smoothed latency, smoothed loss, AIMD congestion window).
+    """
+
+    def __init__(
+        self,
+        server: str,
+        port: int = 53,
+        window: float = 32.0,
+        min_window: float = 1.0,
+        max_window: float = 1024.0,
+    ) -> None:
+        self.server = server
+        self.port = port
+        self.window = float(window)
+        self.min_window = float(min_window)
+        self.max_window = float(max_window)
+        self.inflight = 0
+        self.latency: Optional[float] = None  # EWMA round trip, seconds
+        self.loss = 0.0  # EWMA of timeouts per query
+        self.sent = 0
+        self.answered = 0
+        self.timeouts = 0
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.udp: Optional[asyncio.DatagramTransport] = None
+        self._last_cut = 0.0
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.udp, _ = await loop.create_datagram_endpoint(
+            lambda: _PipelineProtocol(self.pending),
+            remote_addr=(self.server, self.port),
+        )
+
+    def close(self) -> None:
+        for fut in self.pending.values():
+            if not fut.done():
+                fut.cancel()
+        self.pending.clear()
+        if self.udp is not None:
+            self.udp.close()
+            self.udp = None
+
+    def score(self) -> float:
+        """
+        Lower is healthier. Servers we have not heard from yet score 0 so
+        they get tried early; ones that only ever timed out score as if
+        they took a full second.
+        """
+        latency = self.latency
+        if latency is None:
+            latency = 1.0 if self.timeouts else 0.0
+        return latency * (1.0 + 10.0 * self.loss)
+
+    def _new_id(self) -> int:
+        while True:
+            qid = dns.entropy.random_16()
+            if qid not in self.pending:
+                return qid
+
+    async def exchange(
+        self, query: dns.message.Message, timeout: float
+    ) -> Optional[dns.message.Message]:
+        """
+        Send `query` once and wait for its answer. Returns None on loss.
+        """
+        loop = asyncio.get_running_loop()
+        query.id = self._new_id()
+        fut = loop.create_future()
+        self.pending[query.id] = fut
+        self.sent += 1
+        started = time.monotonic()
+        try:
+            self.udp.sendto(query.to_wire())
+            data = await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            self._on_timeout(timeout)
+            return None
+        finally:
+            self.pending.pop(query.id, None)
+
+        try:
+            response = dns.message.from_wire(data)
+        except dns.exception.DNSException:
+            return None
+        if not query.is_response(response):
+            return None
+        self._on_answer(time.monotonic() - started)
+        return response
+
+    def _on_answer(self, rtt: float) -> None:
+        self.answered += 1
+        self.latency = rtt if self.latency is None else 0.8 * self.latency + 0.2 * rtt
+        self.loss *= 0.95
+        # additive increase: about +1 per window's worth of answers
+        self.window = min(self.max_window, self.window + 1.0 / self.window)
+
+    def _on_timeout(self, timeout: float) -> None:
+        self.timeouts += 1
+        self.loss = 0.95 * self.loss + 0.05
+        # multiplicative decrease, at most once per round trip so a burst
+        # of timeouts from one loss event doesn't collapse the window
+        now = time.monotonic()
+        if now - self._last_cut >= (self.latency or timeout):
+            self.window = max(self.min_window, self.window / 2.0)
+            self._last_cut = now
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "server": self.server,
+            "port": self.port,
+            "window": round(self.window, 2),
+            "inflight": self.inflight,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 2),
+            "loss": round(self.loss, 4),
+            "sent": self.sent,
+            "answered": self.answered,
+            "timeouts": self.timeouts,
+        }
+
+
+class DNSTransport:
+    """
+    Lightweight DNS client that keeps many queries in flight over one
+    connected UDP socket instead of one resolver object + socket per lookup.
+
+    - responses are matched back to queries by transaction ID
+    - lost queries are retransmitted `retries` times, `timeout` seconds apart
+    - truncated (TC) answers are re-asked over TCP
+
+    The socket lives on a private event loop in a daemon thread, so the same
+    transport can serve the blocking helpers (resolve_a, dns_request) and
+    the async engine at the same time:
+
+        with DNSTransport("1.1.1.1") as t:
+            resolve_a("www.example.com", transport=t)
+    """
+
+    def __init__(
+        self,
+        server: Optional[str] = None,
+        port: int = 53,
+        timeout: float = 2.0,
+        retries: int = 2,
+        max_inflight: int = 4096,
+    ) -> None:
+        if server is None:
+            server = dns.resolver.get_default_resolver().nameservers[0]
+        server, port = split_nameserver(server, port)
+        self.timeout = timeout
+        self.retries = retries
+        # Stay well below 65536 so a free transaction ID is always easy to find.
+        self.max_inflight = min(max_inflight, 30000)
+
+        self._upstreams: List[_Upstream] = [_Upstream(server, port)]
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    @property
+    def server(self) -> str:
+        return self._upstreams[0].server
+
+    @property
+    def port(self) -> int:
+        return self._upstreams[0].port
+
+    # -- lifecycle --
+
+    def start(self) -> "DNSTransport":
+        with self._lock:
+            if self._thread is not None:
+                return self
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=loop.run_forever, name="dns-transport", daemon=True
+            )
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._open(), loop).result()
+            except BaseException:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+                raise
+            self._loop, self._thread = loop, thread
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            loop, thread = self._loop, self._thread
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            self._loop = self._thread = None
+
+    def __enter__(self) -> "DNSTransport":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    async def _open(self) -> None:
+        for upstream in self._upstreams:
+            await upstream.open()
+        self._slots = asyncio.Semaphore(self.max_inflight)
+
+    async def _shutdown(self) -> None:
+        for upstream in self._upstreams:
+            upstream.close()
+
+    # -- upstream selection (ResolverPool overrides these) --
+
+    async def _acquire(self, tried: List[_Upstream]) -> _Upstream:
+        upstream = self._upstreams[0]
+        upstream.inflight += 1
+        return upstream
+
+    async def _release(self, upstream: _Upstream) -> None:
+        upstream.inflight -= 1
+
+    # -- queries --
+
+    async def query(self, name: str, rdtype: str = "A") -> dns.message.Message:
+        """
+        Send one query and return the parsed response (any rcode).
+        Usable from any event loop. Raises dns.exception.Timeout.
+        """
+        self.start()
+        fut = asyncio.run_coroutine_threadsafe(self._query(name, rdtype), self._loop)
+        return await asyncio.wrap_future(fut)
+
+    def query_sync(self, name: str, rdtype: str = "A") -> dns.message.Message:
+        """
+        Blocking version of query().
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self._query(name, rdtype), self._loop
+        ).result()
+
+    async def _query(self, name: str, rdtype: str) -> dns.message.Message:
+        query = dns.message.make_query(name, rdtype, use_edns=0, payload=1232)
+
+        response = None
+        tried: List[_Upstream] = []
+        async with self._slots:
+            for _ in range(self.retries + 1):
+                upstream = await self._acquire(tried)
+                tried.append(upstream)
+                try:
+                    response = await upstream.exchange(query, self.timeout)
+                finally:
+                    await self._release(upstream)
+                if response is not None:
+                    break
+
+        if response is None:
+            raise dns.exception.Timeout(timeout=self.timeout * (self.retries + 1))
+
+        if response.flags & dns.flags.TC:
+            response = await dns.asyncquery.tcp(
+                query, upstream.server, timeout=self.timeout, port=upstream.port
+            )
+        return response
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Per-upstream health counters (see _Upstream.stats).
+        """
+        return [upstream.stats() for upstream in self._upstreams]
+
+
+class ResolverPool(DNSTransport):
+    """
+    DNSTransport over several upstream resolvers at once.
+
+    Every query goes to the healthiest server (lowest smoothed latency,
+    penalised by recent loss) that still has room in its congestion window.
+    Windows grow additively on answers and halve on timeouts (AIMD), so a
+    slow or rate-limiting upstream sheds load to the others instead of
+    dragging the whole run into retries. A retransmit may land on a
+    different server than the original attempt.
+
+        with ResolverPool(["1.1.1.1", "8.8.8.8", "9.9.9.9"]) as pool:
+            resolve_a("www.example.com", transport=pool)
+    """
+
+    def __init__(
+        self,
+        servers: List[str],
+        port: int = 53,
+        timeout: float = 2.0,
+        retries: int = 2,
+        max_inflight: int = 4096,
+        initial_window: float = 32.0,
+        min_window: float = 1.0,
+        max_window: float = 1024.0,
+    ) -> None:
+        if not servers:
+            raise ValueError("ResolverPool needs at least one server")
+        super().__init__(servers[0], port, timeout, retries, max_inflight)
+        self._upstreams = [
+            _Upstream(*split_nameserver(server, port), initial_window, min_window, max_window)
+            for server in servers
+        ]
+        self._room: Optional[asyncio.Condition] = None
+
+    async def _open(self) -> None:
+        await super()._open()
+        self._room = asyncio.Condition()
+
+    async def _acquire(self, tried: List[_Upstream]) -> _Upstream:
+        async with self._room:
+            while True:
+                ready = [u for u in self._upstreams if u.inflight < int(u.window)]
+                if ready:
+                    # retransmits go to a server this query hasn't tried yet
+                    fresh = [u for u in ready if u not in tried]
+                    upstream = min(fresh or ready, key=_Upstream.score)
+                    upstream.inflight += 1
+                    return upstream
+                await self._room.wait()
+
+    async def _release(self, upstream: _Upstream) -> None:
+        async with self._room:
+            upstream.inflight -= 1
+            self._room.notify()
+
+
+def _answer_texts(response: dns.message.Message, rdtype: str) -> List[str]:
+    """
+    Pull the rdata strings of one type out of a raw response.
+    NXDOMAIN / SERVFAIL / empty answers all come back as [].
+    """
+    if response.rcode() != dns.rcode.NOERROR:
+        return []
+    wanted = dns.rdatatype.from_text(rdtype)
+    return [
+        rdata.to_text()
+        for rrset in response.answer
+        if rrset.rdtype == wanted
+        for rdata in rrset
+    ]
+
+
+# ---------- (g) Resolver cache ---------- #
+
+class ResolverCache:
+    """
+    In-process LRU cache shared by forward (A) and reverse (PTR) lookups.
+
+    - positive answers live for the record TTL
+    - NXDOMAIN / NoAnswer are cached as [] for the SOA minimum (RFC 2308)
+    - timeouts and server failures are never cached
+    - optionally loaded from / saved to a JSON file so repeated runs against
+      the same domain skip names that were already answered
+
+    Keys look like "A:www.example.com" or "PTR:10.0.0.1".
+
+    Not locked: every lookup path uses a cache from a single thread (the
+    caller's for the sync API, the event loop's for the async one).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 100_000,
+        path: Optional[str] = None,
+        default_ttl: int = 300,
+        negative_ttl: int = 60,
+    ) -> None:
+        self.max_entries = max_entries
+        self.path = path
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (values, expires_at wall-clock seconds)
+        self._entries: "OrderedDict[str, Tuple[List[str], float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        Return cached values ([] for a cached negative answer), or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        values, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(values)
+
+    def put(self, key: str, values: List[str], ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._entries[key] = (list(values), time.time() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self) -> None:
+        """
+        Merge unexpired entries from self.path, if it exists.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        for key, values, expires_at in data.get("entries", []):
+            if expires_at > now:
+                self._entries[key] = (values, expires_at)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        """
+        Write unexpired entries to self.path (atomically, via a temp file).
+        """
+        if not self.path:
+            return
+        now = time.time()
+        entries = [
+            [key, values, expires_at]
+            for key, (values, expires_at) in self._entries.items()
+            if expires_at > now
+        ]
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f)
+        os.replace(tmp, self.path)
+
+
+def _negative_ttl(response: Optional[dns.message.Message], default: int) -> int:
+    """
+    Negative-caching TTL from the SOA in the authority section.
+    """
+    if response is not None:
+        for rrset in response.authority:
+            if rrset.rdtype == dns.rdatatype.SOA:
+                return min(rrset.ttl, rrset[0].minimum)
+    return default
+
+
+def _response_ttl(response: dns.message.Message, rdtype: str, default: int) -> Optional[int]:
+    """
+    How long a raw transport response may be cached, or None if it must not be.
+    """
+    rcode = response.rcode()
+    if rcode == dns.rcode.NXDOMAIN:
+        return _negative_ttl(response, default)
+    if rcode != dns.rcode.NOERROR:
+        return None
+    wanted = dns.rdatatype.from_text(rdtype)
+    ttls = [rrset.ttl for rrset in response.answer if rrset.rdtype == wanted]
+    return min(ttls) if ttls else _negative_ttl(response, default)
+
+
+def _exception_ttl(exc: Exception, default: int) -> Optional[int]:
+    """
+    Negative-caching TTL for a dns.resolver exception, or None if the
+    failure is transient (timeout, no nameservers) and must not be cached.
+    """
+    if isinstance(exc, dns.resolver.NXDOMAIN):
+        responses = exc.kwargs.get("responses") or {}
+        return _negative_ttl(next(iter(responses.values()), None), default)
+    if isinstance(exc, dns.resolver.NoAnswer):
+        return _negative_ttl(exc.kwargs.get("response"), default)
+    return None
+
+
+# ---------- (n) Query instrumentation ---------- #
+
+OUTCOMES = ("answer", "nxdomain", "noanswer", "servfail", "timeout", "error")
+
+# Latency histogram bucket upper bounds, seconds (last bucket is open-ended).
+LATENCY_BUCKETS = (
+    0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0,
+)
+
+
+class QueryStats:
+    """
+    Counters for every lookup that goes on the wire: outcome (answer,
+    nxdomain, noanswer, servfail, timeout, error), a log-bucketed latency
+    histogram, how many queries are in flight right now (and the peak),
+    plus cache hits and process CPU time so "slow upstream" can be told
+    apart from "we're CPU bound".
+
+    Cheap enough to leave on: one bisect and a few integer bumps per query.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self._cpu_started = time.process_time()
+        self.outcomes: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+        self.buckets: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.cached = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+
+    @property
+    def queries(self) -> int:
+        return sum(self.outcomes.values())
+
+    def begin(self) -> float:
+        self.inflight += 1
+        if self.inflight > self.peak_inflight:
+            self.peak_inflight = self.inflight
+        return time.monotonic()
+
+    def end(self, started: float, outcome: str) -> None:
+        self.inflight -= 1
+        self.outcomes[outcome] += 1
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, time.monotonic() - started)] += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Upper bound (seconds) of the bucket holding the pct-th latency;
+        None if nothing was measured, inf if it is in the overflow bucket.
+        """
+        total = sum(self.buckets)
+        if not total:
+            return None
+        threshold = pct / 100 * total
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.buckets):
+            running += count
+            if running >= threshold:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Raw counters, picklable, for merge() across worker processes.
+        """
+        return {
+            "outcomes": dict(self.outcomes),
+            "buckets": list(self.buckets),
+            "cached": self.cached,
+            "peak_inflight": self.peak_inflight,
+        }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        for outcome, count in snapshot["outcomes"].items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+        for i, count in enumerate(snapshot["buckets"]):
+            self.buckets[i] += count
+        self.cached += snapshot["cached"]
+        self.peak_inflight = max(self.peak_inflight, snapshot["peak_inflight"])
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+
+        def ms(value: Optional[float]) -> Any:
+            if value is None:
+                return None
+            if value == float("inf"):
+                return f">{int(LATENCY_BUCKETS[-1] * 1000)}"
+            return round(value * 1000, 2)
+
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "queries": self.queries,
+            "qps": round(self.queries / elapsed, 1),
+            "cached": self.cached,
+            "outcomes": dict(self.outcomes),
+            "inflight": self.inflight,
+            "peak_inflight": self.peak_inflight,
+            "latency_ms": {
+                "p50": ms(self.percentile(50)),
+                "p90": ms(self.percentile(90)),
+                "p99": ms(self.percentile(99)),
+                "buckets": {
+                    (f"<={int(b * 1000)}" if b < 1 else f"<={b:g}s"): n
+                    for b, n in zip(LATENCY_BUCKETS, self.buckets)
+                },
+                "overflow": self.buckets[-1],
+            },
+            "cpu_percent": round(
+                100 * (time.process_time() - self._cpu_started) / elapsed, 1
+            ),
+        }
+
+    def progress_line(self) -> str:
+        s = self.summary()
+        o = s["outcomes"]
+        p50, p99 = s["latency_ms"]["p50"], s["latency_ms"]["p99"]
+        return (
+            f"[stats] {s['elapsed_s']:.0f}s q={s['queries']} ({s['qps']}/s) "
+            f"ans={o['answer']} nx={o['nxdomain']} noans={o['noanswer']} "
+            f"servfail={o['servfail']} timeout={o['timeout']} err={o['error']} "
+            f"cached={s['cached']} inflight={s['inflight']} "
+            f"p50<={p50}ms p99<={p99}ms cpu={s['cpu_percent']}%"
+        )
+
+
+class StatsReporter:
+    """
+    Daemon thread that prints stats.progress_line() every `interval` seconds.
+    """
+
+    def __init__(
+        self, stats: QueryStats, interval: float, stream: TextIO = sys.stderr
+    ) -> None:
+        self.stats = stats
+        self.interval = interval
+        self.stream = stream
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dns-stats", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            print(self.stats.progress_line(), file=self.stream, flush=True)
+
+    def start(self) -> "StatsReporter":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def _response_outcome(response: dns.message.Message, texts: List[str]) -> str:
+    rcode = response.rcode()
+    if rcode == dns.rcode.NXDOMAIN:
+        return "nxdomain"
+    if rcode == dns.rcode.SERVFAIL:
+        return "servfail"
+    if rcode != dns.rcode.NOERROR:
+        return "error"
+    return "answer" if texts else "noanswer"
+
+
+def _exception_outcome(exc: Exception) -> str:
+    if isinstance(exc, dns.resolver.NXDOMAIN):
+        return "nxdomain"
+    if isinstance(exc, dns.resolver.NoAnswer):
+        return "noanswer"
+    if isinstance(exc, dns.resolver.NoNameservers):
+        return "servfail"
+    if isinstance(exc, dns.exception.Timeout):
+        return "timeout"
+    return "error"
+
+
+def _lookup(
+    key: str,
+    qname: str,
+    rdtype: str,
+    transport: Optional[DNSTransport],
+    cache: Optional[ResolverCache],
+    stats: Optional[QueryStats] = None,
+) -> List[str]:
+    """
+    One cached lookup through either the transport or dns.resolver.
+    Returns rdata strings; every failure comes back as [].
+    """
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            if stats is not None:
+                stats.cached += 1
+            return cached
+
+    default_ttl = cache.negative_ttl if cache is not None else 0
+    started = stats.begin() if stats is not None else 0.0
+    if transport is not None:
+        try:
+            response = transport.query_sync(qname, rdtype)
+        except LOOKUP_FAILURES as e:
+            if stats is not None:
+                stats.end(started, _exception_outcome(e))
+            return []
+        texts = _answer_texts(response, rdtype)
+        ttl = _response_ttl(response, rdtype, default_ttl)
+        outcome = _response_outcome(response, texts)
+    else:
+        try:
+            answers = dns.resolver.resolve(qname, rdtype)
+            texts = [rdata.to_text() for rdata in answers]
+            ttl = answers.rrset.ttl
+            outcome = "answer"
+        except RESOLVE_ERRORS as e:
+            texts, ttl = [], _exception_ttl(e, default_ttl)
+            outcome = _exception_outcome(e)
+        except LOOKUP_FAILURES:
+            texts, ttl, outcome = [], None, "error"
+        except Exception:
+            if stats is not None:
+                stats.end(started, "error")
+            raise
+    if stats is not None:
+        stats.end(started, outcome)
+
+    if cache is not None and ttl is not None:
+        cache.put(key, texts, ttl)
+    return texts
+
+
+def _ptr_qname(ip: str) -> Optional[str]:
+    """
+    in-addr.arpa / ip6.arpa name for an address, or None if it isn't one.
+    """
+    try:
+        return dns.reversename.from_address(ip).to_text()
+    except (dns.exception.SyntaxError, ValueError):
+        return None
+
+
+# ---------- (d) Reverse DNS helper ---------- #
+
+def reverse_dns(
+    ip: str,
+    cache: Optional[ResolverCache] = None,
+    transport: Optional[DNSTransport] = None,
+    stats: Optional[QueryStats] = None,
+) -> List[str]:
+    """
+    Return PTR/hostnames for an IP address.
+
+    Equivalent to your reverseDNS(ip) sketch. Goes through the DNS library
+    (not libc's gethostbyaddr) so answers carry a TTL and can be cached.
+    """
+    qname = _ptr_qname(ip)
+    if qname is None:
+        return []
+    names = _lookup(f"PTR:{ip}", qname, "PTR", transport, cache, stats)
+    return [name.rstrip(".") for name in names]
+
+
+# ---------- (c) Single DNS A lookup ---------- #
+
+def resolve_a(
+    name: str,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+) -> List[str]:
+    """
+    Resolve A records for a hostname, return list of IP strings.
+    Goes through `transport` instead of dns.resolver when one is given.
+    """
+    return _lookup(f"A:{name}", name, "A", transport, cache, stats)
+
+
+def dns_request(
+    name: str,
+    do_reverse: bool = True,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+) -> List[Tuple[str, List[str]]]:
+    """
+    Perform DNS request for A records and optional reverse DNS.
+    Returns list of (ip, [ptr_names]) tuples.
+    """
+    ips = resolve_a(name, transport=transport, cache=cache, stats=stats)
+    results: List[Tuple[str, List[str]]] = []
+
+    for ip in ips:
+        ptrs = []
+        if do_reverse:
+            ptrs = reverse_dns(ip, cache=cache, transport=transport, stats=stats)
+        results.append((ip, ptrs))
+
+    return results
+
+
+# ---------- Result structure ---------- #
+
+# slots=True needs 3.10; older interpreters just get a regular dataclass
+_SLOTS: Dict[str, bool] = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_SLOTS)
+class DNSRecord:
+    fqdn: str
+    ip: str  # address, or the final CNAME target when rtype is "CNAME"
+    ptrs: List[str]
+    domain: Optional[str] = None  # apex it was found under, in multi-domain runs
+    rtype: str = "A"
+    chain: Tuple[str, ...] = ()  # CNAME targets, in order
+
+
+# ---------- (k) Wildcard detection ---------- #
+
+class WildcardFilter:
+    """
+    Detects wildcard zones by resolving a few random labels under them and
+    remembering the union of the answers as that zone's fingerprint.
+
+    A candidate whose A answers all fall inside the fingerprint of its
+    parent zone is a wildcard echo, not a real host, and is dropped before
+    any PTR lookup or DNSRecord is made. Zones are probed lazily the first
+    time a candidate under them resolves, so sub-zones with their own
+    wildcard (a.b.example.com under b.example.com) are handled too; call
+    fingerprint() / fingerprint_async() on the apex for an up-front check.
+    """
+
+    def __init__(self, probes: int = 3) -> None:
+        self.probes = probes
+        self._fingerprints: Dict[str, FrozenSet[str]] = {}
+        self._probing: Dict[str, asyncio.Task] = {}
+
+    def _labels(self, zone: str) -> List[str]:
+        return [f"{secrets.token_hex(8)}.{zone}" for _ in range(self.probes)]
+
+    @staticmethod
+    def _parent(fqdn: str) -> Optional[str]:
+        parts = fqdn.rstrip(".").split(".", 1)
+        return parts[1] if len(parts) == 2 and "." in parts[1] else None
+
+    def fingerprint(
+        self, zone: str, transport: Optional[DNSTransport] = None
+    ) -> FrozenSet[str]:
+        """
+        IPs that random names under `zone` resolve to (empty: no wildcard).
+        """
+        if zone not in self._fingerprints:
+            ips = set()
+            for name in self._labels(zone):
+                ips.update(resolve_a(name, transport=transport))
+            self._fingerprints[zone] = frozenset(ips)
+        return self._fingerprints[zone]
+
+    async def fingerprint_async(
+        self,
+        zone: str,
+        resolver: Optional[dns.asyncresolver.Resolver] = None,
+        transport: Optional[DNSTransport] = None,
+    ) -> FrozenSet[str]:
+        """
+        Async version of fingerprint(). Concurrent callers share one probe.
+        """
+        if zone in self._fingerprints:
+            return self._fingerprints[zone]
+
+        task = self._probing.get(zone)
+        if task is None:
+            async def probe() -> FrozenSet[str]:
+                answers = await asyncio.gather(
+                    *(
+                        resolve_a_async(name, resolver=resolver, transport=transport)
+                        for name in self._labels(zone)
+                    )
+                )
+                ips = frozenset(ip for ips in answers for ip in ips)
+                self._fingerprints[zone] = ips
+                return ips
+
+            task = asyncio.ensure_future(probe())
+            self._probing[zone] = task
+            task.add_done_callback(lambda _: self._probing.pop(zone, None))
+        return await asyncio.shield(task)
+
+    def is_wildcard(
+        self,
+        fqdn: str,
+        ips: List[str],
+        transport: Optional[DNSTransport] = None,
+    ) -> bool:
+        zone = self._parent(fqdn)
+        if zone is None or not ips:
+            return False
+        wildcard_ips = self.fingerprint(zone, transport=transport)
+        return bool(wildcard_ips) and wildcard_ips.issuperset(ips)
+
+    async def is_wildcard_async(
+        self,
+        fqdn: str,
+        ips: List[str],
+        resolver: Optional[dns.asyncresolver.Resolver] = None,
+        transport: Optional[DNSTransport] = None,
+    ) -> bool:
+        zone = self._parent(fqdn)
+        if zone is None or not ips:
+            return False
+        wildcard_ips = await self.fingerprint_async(
+            zone, resolver=resolver, transport=transport
+        )
+        return bool(wildcard_ips) and wildcard_ips.issuperset(ips)
+
+
+# ---------- (b) SubdomainSearch() ---------- #
+
+def subdomain_search(
+    domain: str,
+    wordlist: Iterable[str],
+    nums: bool = True,
+    rules: Optional[List[MutationRule]] = None,
+    dedupe: Optional[BloomFilter] = None,
+    do_reverse: bool = True,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+    wildcards: Optional[WildcardFilter] = None,
+) -> List[DNSRecord]:
+    """
+    Try <word>.<domain> and optionally <word><0-9>.<domain>.
+
+    This is your SubdomainSearch(domain, dictionary, nums).
+    Returns a list of DNSRecord objects for everything that resolves.
+    """
+    return list(
+        iter_subdomain_search(
+            domain,
+            wordlist,
+            nums=nums,
+            rules=rules,
+            dedupe=dedupe,
+            do_reverse=do_reverse,
+            transport=transport,
+            cache=cache,
+            stats=stats,
+            wildcards=wildcards,
+        )
+    )
+
+
+def iter_subdomain_search(
+    domain: str,
+    wordlist: Iterable[str],
+    nums: bool = True,
+    rules: Optional[List[MutationRule]] = None,
+    dedupe: Optional[BloomFilter] = None,
+    do_reverse: bool = True,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+    wildcards: Optional[WildcardFilter] = None,
+    checkpoint: Optional["Checkpoint"] = None,
+) -> Iterator[DNSRecord]:
+    """
+    Generator version of subdomain_search(): yields each DNSRecord as soon
+    as its name resolves instead of building the whole list first.
+
+    Each unique IP is reverse-resolved once per run, however many names
+    point at it. With a WildcardFilter, wildcard echoes are skipped. With a
+    Checkpoint, already-finished candidates are skipped and progress saved.
+    """
+    ptr_memo: Dict[str, List[str]] = {}
+
+    candidates = iter_candidates(domain, wordlist, nums=nums, rules=rules, dedupe=dedupe)
+    start = 0
+    if checkpoint is not None:
+        start = checkpoint.cursor
+        candidates = itertools.islice(candidates, start, None)
+
+    for index, fqdn in enumerate(candidates, start):
+        ips = resolve_a(fqdn, transport=transport, cache=cache, stats=stats)
+        if wildcards is not None and wildcards.is_wildcard(fqdn, ips, transport=transport):
+            ips = []
+        for ip in ips:
+            ptrs: List[str] = []
+            if do_reverse:
+                if ip not in ptr_memo:
+                    ptr_memo[ip] = reverse_dns(
+                        ip, cache=cache, transport=transport, stats=stats
+                    )
+                ptrs = list(ptr_memo[ip])
+            rec = DNSRecord(fqdn=fqdn, ip=ip, ptrs=ptrs)
+            if checkpoint is not None:
+                checkpoint.add_record(index, rec)
+            yield rec
+        if checkpoint is not None:
+            checkpoint.mark_done(index)
+
+
+def iter_candidates(
+    domain: str,
+    wordlist: Iterable[str],
+    nums: bool = True,
+    rules: Optional[List["MutationRule"]] = None,
+    dedupe: Optional["BloomFilter"] = None,
+) -> Iterator[str]:
+    """
+    Yield the FQDNs subdomain_search() would try, in the same order:
+    each word, then its numeric variants (word0 ... word9), then whatever
+    the extra mutation `rules` produce. With a BloomFilter, names already
+    generated are skipped. Names that can't exist in DNS (a label over 63
+    octets, an empty label, or more than 253 octets in all) are dropped
+    here rather than sent.
+    """
+    all_rules: List[MutationRule] = [NumericSuffixRule()] if nums else []
+    all_rules.extend(rules or [])
+
+    for word in wordlist:
+        word = word.strip()
+        if not word:
+            continue
+
+        # base word: word.domain, then its mutations
+        for label in _labels_for(word, all_rules):
+            fqdn = f"{label}.{domain}"
+            if not _name_fits(fqdn):
+                continue
+            if dedupe is not None and not dedupe.add(fqdn.lower()):
+                continue
+            yield fqdn
+
+
+MAX_LABEL_OCTETS = 63
+MAX_NAME_OCTETS = 253
+
+
+def _name_fits(fqdn: str) -> bool:
+    """
+    True if `fqdn` is a legal DNS name: every label 1-63 octets (IDNA
+    encoded when it isn't ASCII) and at most 253 octets overall.
+    """
+    labels = fqdn.rstrip(".").split(".")
+    total = len(labels) - 1
+    for label in labels:
+        if not label.isascii():
+            try:
+                label = label.encode("idna")
+            except UnicodeError:
+                return False
+        if not 0 < len(label) <= MAX_LABEL_OCTETS:
+            return False
+        total += len(label)
+    return total <= MAX_NAME_OCTETS
+
+
+def _labels_for(word: str, rules: List["MutationRule"]) -> Iterator[str]:
+    yield word
+    for rule in rules:
+        yield from rule(word)
+
+
+# ---------- (l) Candidate generation ---------- #
+
+class MutationRule:
+    """
+    Turns one wordlist entry into extra labels to try. Subclasses implement
+    __call__; they must be picklable so --workers can ship them around.
+    """
+
+    def __call__(self, word: str) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class NumericSuffixRule(MutationRule):
+    """
+    word0 ... word9 (the classic `nums` variants), optionally www-1 style.
+    """
+
+    def __init__(
+        self,
+        digits: Iterable[int] = range(10),
+        separators: Iterable[str] = ("",),
+    ) -> None:
+        self.digits = [str(d) for d in digits]
+        self.separators = list(separators)
+
+    def __call__(self, word: str) -> Iterator[str]:
+        for sep in self.separators:
+            for digit in self.digits:
+                yield f"{word}{sep}{digit}"
+
+
+class AffixRule(MutationRule):
+    """
+    Prefixes and suffixes from a second list, glued on with each separator:
+    with affixes ["dev"] and separators ("", "-", "."), "api" becomes
+    devapi, dev-api, dev.api, apidev, api-dev, api.dev.
+    """
+
+    def __init__(
+        self,
+        affixes: Iterable[str],
+        separators: Iterable[str] = ("", "-", "."),
+        prefixes: bool = True,
+        suffixes: bool = True,
+    ) -> None:
+        self.affixes = [a.strip() for a in affixes if a.strip()]
+        self.separators = list(separators)
+        self.prefixes = prefixes
+        self.suffixes = suffixes
+
+    def __call__(self, word: str) -> Iterator[str]:
+        for affix in self.affixes:
+            for sep in self.separators:
+                if self.prefixes:
+                    yield f"{affix}{sep}{word}"
+                if self.suffixes:
+                    yield f"{word}{sep}{affix}"
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic set for candidate dedupe. Memory is set up
+    front from `capacity` and `error_rate` (10M names at 0.1% is ~18 MB)
+    and never grows. A false positive means a candidate is skipped, with
+    probability about `error_rate` once `capacity` names have been added.
+    """
+
+    def __init__(self, capacity: int = 10_000_000, error_rate: float = 0.001) -> None:
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Kirsch-Mitzenmacher: k positions from two 64-bit hashes
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """
+        Add `item`. Returns False if it was (probably) already present.
+        """
+        added = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+
+def iter_wordlist(path: str) -> Iterator[str]:
+    """
+    Lazy load_wordlist(): memory-maps the file and yields one entry at a
+    time, so a multi-GB list costs no more RAM than a small one.
+    Blank lines and comments (#) are ignored.
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # empty file: nothing to map
+        with mm:
+            for raw in iter(mm.readline, b""):
+                line = raw.decode("utf-8", errors="replace").strip()
+                if not line or line.startswith("#"):
+                    continue
+                yield line
+
+
+class WordlistFile:
+    """
+    Re-iterable iter_wordlist() over one shared memory map. Every iter() is
+    an independent cursor (its own byte offset) into the same mapping, so
+    a thousand domains walking the list at once hold one file descriptor
+    between them, not one each. close() (or the with block) unmaps it.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._empty = False
+
+    def __enter__(self) -> "WordlistFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _map(self) -> Optional[mmap.mmap]:
+        if self._mm is None and not self._empty:
+            with open(self.path, "rb") as f:
+                try:
+                    self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    self._empty = True  # empty file: nothing to map
+        return self._mm
+
+    def __iter__(self) -> Iterator[str]:
+        mm = self._map()
+        if mm is None:
+            return
+        pos, end = 0, len(mm)
+        while pos < end:
+            newline = mm.find(b"\n", pos)
+            if newline < 0:
+                newline = end
+            line = mm[pos:newline].decode("utf-8", errors="replace").strip()
+            pos = newline + 1
+            if not line or line.startswith("#"):
+                continue
+            yield line
+
+
+# ---------- (e) Async engine ---------- #
+
+def make_async_resolver(
+    timeout: float = 2.0,
+    nameserver: Optional[str] = None,
+) -> dns.asyncresolver.Resolver:
+    """
+    Build an asyncio resolver from the system config with a per-query timeout.
+    """
+    resolver = dns.asyncresolver.Resolver()
+    resolver.timeout = timeout
+    resolver.lifetime = timeout
+    if nameserver:
+        host, resolver.port = split_nameserver(nameserver)
+        resolver.nameservers = [host]
+    return resolver
+
+
+async def _lookup_async(
+    key: str,
+    qname: str,
+    rdtype: str,
+    resolver: Optional[dns.asyncresolver.Resolver],
+    transport: Optional[DNSTransport],
+    cache: Optional[ResolverCache],
+    stats: Optional[QueryStats] = None,
+) -> List[str]:
+    """
+    Async version of _lookup().
+    """
+    texts, _ = await _resolve_async(key, qname, rdtype, resolver, transport, cache, stats)
+    return texts
+
+
+async def _resolve_async(
+    key: str,
+    qname: str,
+    rdtype: str,
+    resolver: Optional[dns.asyncresolver.Resolver],
+    transport: Optional[DNSTransport],
+    cache: Optional[ResolverCache],
+    stats: Optional[QueryStats] = None,
+) -> Tuple[List[str], bool]:
+    """
+    _lookup_async() that also says whether `qname` exists at all: False
+    only for NXDOMAIN, which is remembered in the cache as "NX:<qname>".
+    """
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            if stats is not None:
+                stats.cached += 1
+            return cached, bool(cached) or cache.get(f"NX:{qname}") is None
+
+    default_ttl = cache.negative_ttl if cache is not None else 0
+    started = stats.begin() if stats is not None else 0.0
+    if transport is not None:
+        try:
+            response = await transport.query(qname, rdtype)
+        except LOOKUP_FAILURES as e:
+            if stats is not None:
+                stats.end(started, _exception_outcome(e))
+            return [], True
+        texts = _answer_texts(response, rdtype)
+        ttl = _response_ttl(response, rdtype, default_ttl)
+        outcome = _response_outcome(response, texts)
+    else:
+        resolver = resolver or make_async_resolver()
+        try:
+            answers = await resolver.resolve(qname, rdtype)
+            texts = [rdata.to_text() for rdata in answers]
+            ttl = answers.rrset.ttl
+            outcome = "answer"
+        except RESOLVE_ERRORS as e:
+            texts, ttl = [], _exception_ttl(e, default_ttl)
+            outcome = _exception_outcome(e)
+        except LOOKUP_FAILURES:
+            texts, ttl, outcome = [], None, "error"
+        except Exception:
+            if stats is not None:
+                stats.end(started, "error")
+            raise
+    if stats is not None:
+        stats.end(started, outcome)
+
+    if cache is not None and ttl is not None:
+        cache.put(key, texts, ttl)
+        if outcome == "nxdomain":
+            cache.put(f"NX:{qname}", [], ttl)
+    return texts, outcome != "nxdomain"
+
+
+async def resolve_a_async(
+    name: str,
+    resolver: Optional[dns.asyncresolver.Resolver] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+) -> List[str]:
+    """
+    Async version of resolve_a(). Same return value, same swallowed errors.
+    """
+    return await _lookup_async(
+        f"A:{name}", name, "A", resolver, transport, cache, stats
+    )
+
+
+async def reverse_dns_async(
+    ip: str,
+    resolver: Optional[dns.asyncresolver.Resolver] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+) -> List[str]:
+    """
+    Async version of reverse_dns().
+    """
+    qname = _ptr_qname(ip)
+    if qname is None:
+        return []
+    names = await _lookup_async(
+        f"PTR:{ip}", qname, "PTR", resolver, transport, cache, stats
+    )
+    return [name.rstrip(".") for name in names]
+
+
+async def dns_request_async(
+    name: str,
+    do_reverse: bool = True,
+    resolver: Optional[dns.asyncresolver.Resolver] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+) -> List[Tuple[str, List[str]]]:
+    """
+    Async version of dns_request(). PTR lookups for the IPs run concurrently.
+    """
+    ips = await resolve_a_async(
+        name, resolver=resolver, transport=transport, cache=cache, stats=stats
+    )
+    if not do_reverse:
+        return [(ip, []) for ip in ips]
+
+    ptr_lists = await asyncio.gather(
+        *(
+            reverse_dns_async(
+                ip, resolver=resolver, transport=transport, cache=cache, stats=stats
+            )
+            for ip in ips
+        )
+    )
+    return list(zip(ips, ptr_lists))
+
+
+# ---------- (q) Multi-type resolution ---------- #
+
+RECORD_TYPES = ("A", "AAAA", "CNAME")
+ADDRESS_TYPES = ("A", "AAAA")
+
+# Longest CNAME chain followed before giving up (loops are cut earlier).
+MAX_CNAME_CHAIN = 8
+
+
+class ChainResolver:
+    """
+    A / AAAA / CNAME resolution for one candidate at a time, with CNAME
+    targets shared across every alias that points at them.
+
+    Each candidate costs one CNAME query up front. NXDOMAIN ends it there,
+    which is what almost every candidate gets, so enumerating three types
+    doesn't cost three queries per name. A name with no CNAME then has its
+    address types queried concurrently. An alias instead has its chain
+    followed hop by hop and the final target's addresses looked up, and
+    every one of those hop and target lookups runs once per run no matter
+    how many aliases reach it (and lands in the ResolverCache for the next
+    run).
+
+    resolve() returns (rtype, value, chain) hits: value is an address, or
+    the final target for a CNAME hit; chain is the CNAME targets in order
+    ([] for a direct answer).
+    """
+
+    def __init__(
+        self,
+        types: Iterable[str] = RECORD_TYPES,
+        resolver: Optional[dns.asyncresolver.Resolver] = None,
+        transport: Optional[DNSTransport] = None,
+        cache: Optional[ResolverCache] = None,
+        stats: Optional[QueryStats] = None,
+    ) -> None:
+        self.types = tuple(t for t in RECORD_TYPES if t in set(types))
+        self.resolver = resolver
+        self.transport = transport
+        self.cache = cache
+        self.stats = stats
+        self._shared: Dict[Tuple[str, str], asyncio.Task] = {}
+
+    async def _query(self, rdtype: str, name: str) -> Tuple[List[str], bool]:
+        return await _resolve_async(
+            f"{rdtype}:{name}",
+            name,
+            rdtype,
+            self.resolver,
+            self.transport,
+            self.cache,
+            self.stats,
+        )
+
+    async def _query_shared(self, rdtype: str, name: str) -> Tuple[List[str], bool]:
+        task = self._shared.get((rdtype, name))
+        if task is None:
+            task = asyncio.ensure_future(self._query(rdtype, name))
+            self._shared[(rdtype, name)] = task
+        texts, exists = await asyncio.shield(task)
+        return list(texts), exists
+
+    async def _addresses(self, name: str, shared: bool) -> Dict[str, List[str]]:
+        query = self._query_shared if shared else self._query
+        wanted = [t for t in ADDRESS_TYPES if t in self.types]
+        answers = await asyncio.gather(*(query(rdtype, name) for rdtype in wanted))
+        return {rdtype: texts for rdtype, (texts, _) in zip(wanted, answers)}
+
+    async def _chain(self, target: str) -> Tuple[List[str], bool]:
+        """
+        Follow CNAMEs from `target`. Returns the targets in order and
+        whether the last one exists.
+        """
+        chain: List[str] = []
+        exists = True
+        while target not in chain and len(chain) < MAX_CNAME_CHAIN:
+            chain.append(target)
+            nxt, exists = await self._query_shared("CNAME", target)
+            if not nxt:
+                break
+            target = nxt[0].rstrip(".").lower()
+        return chain, exists
+
+    async def resolve(self, name: str) -> List[Tuple[str, str, List[str]]]:
+        first, exists = await self._query("CNAME", name)
+        if not exists:
+            return []
+
+        chain: List[str] = []
+        hits: List[Tuple[str, str, List[str]]] = []
+        if first:
+            chain, exists = await self._chain(first[0].rstrip(".").lower())
+            if "CNAME" in self.types:
+                hits.append(("CNAME", chain[-1], chain))
+            addresses = await self._addresses(chain[-1], shared=True) if exists else {}
+        else:
+            addresses = await self._addresses(name, shared=False)
+
+        for rtype in ADDRESS_TYPES:
+            hits.extend((rtype, value, chain) for value in addresses.get(rtype, []))
+        return hits
+
+    def cancel(self) -> None:
+        for task in self._shared.values():
+            task.cancel()
+
+
+def parse_record_types(spec: str) -> Tuple[str, ...]:
+    """
+    "a,aaaa" -> ("A", "AAAA"). Raises ValueError on unknown types.
+    """
+    types = {t.strip().upper() for t in spec.split(",") if t.strip()}
+    unknown = types - set(RECORD_TYPES)
+    if unknown or not types:
+        raise ValueError(
+            f"record types must be some of {', '.join(RECORD_TYPES)}, not {spec!r}"
+        )
+    return tuple(t for t in RECORD_TYPES if t in types)
+
+
+# ---------- (i) Batched PTR phase ---------- #
+
+async def resolve_ptrs_async(
+    ips: Iterable[str],
+    concurrency: int = 100,
+    resolver: Optional[dns.asyncresolver.Resolver] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+) -> Dict[str, List[str]]:
+    """
+    Reverse-resolve a set of IPs concurrently, each unique IP exactly once.
+    Returns {ip: [ptr names]}.
+    """
+    pending = iter(dict.fromkeys(ips))
+    ptrs: Dict[str, List[str]] = {}
+
+    async def worker() -> None:
+        for ip in pending:
+            ptrs[ip] = await reverse_dns_async(
+                ip, resolver=resolver, transport=transport, cache=cache, stats=stats
+            )
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return ptrs
+
+
+async def attach_ptrs_async(
+    records: List[DNSRecord],
+    concurrency: int = 100,
+    resolver: Optional[dns.asyncresolver.Resolver] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+) -> List[DNSRecord]:
+    """
+    Reverse phase for a finished forward pass: collect the unique IPs,
+    resolve them in one concurrent batch, and fill in rec.ptrs in place.
+    """
+    ptrs = await resolve_ptrs_async(
+        (rec.ip for rec in records if rec.rtype in ADDRESS_TYPES),
+        concurrency=concurrency,
+        resolver=resolver,
+        transport=transport,
+        cache=cache,
+        stats=stats,
+    )
+    for rec in records:
+        rec.ptrs = list(ptrs.get(rec.ip, []))
+    return records
+
+
+class _PTRStage:
+    """
+    Streaming counterpart of attach_ptrs_async(): every unique IP is
+    reverse-resolved once, in its own task, no matter how many records
+    (or concurrent forward lookups) point at it.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        resolver: Optional[dns.asyncresolver.Resolver],
+        transport: Optional[DNSTransport],
+        cache: Optional[ResolverCache],
+        stats: Optional[QueryStats] = None,
+    ) -> None:
+        self.resolver = resolver
+        self.transport = transport
+        self.cache = cache
+        self.stats = stats
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._lookups: Dict[str, asyncio.Task] = {}
+
+    async def _resolve(self, ip: str) -> List[str]:
+        async with self._slots:
+            return await reverse_dns_async(
+                ip,
+                resolver=self.resolver,
+                transport=self.transport,
+                cache=self.cache,
+                stats=self.stats,
+            )
+
+    async def ptrs(self, ip: str) -> List[str]:
+        task = self._lookups.get(ip)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve(ip))
+            self._lookups[ip] = task
+        return list(await asyncio.shield(task))
+
+    def cancel(self) -> None:
+        for task in self._lookups.values():
+            task.cancel()
+
+
+async def _search_indexed_async(
+    candidates: Union[Iterable[str], "DomainScheduler"],
+    do_reverse: bool,
+    concurrency: int,
+    resolver: dns.asyncresolver.Resolver,
+    transport: Optional[DNSTransport],
+    cache: Optional[ResolverCache],
+    wildcards: Optional[WildcardFilter] = None,
+    start: int = 0,
+    report_done: bool = False,
+    stats: Optional[QueryStats] = None,
+    types: Optional[Tuple[str, ...]] = None,
+) -> AsyncIterator[Tuple[int, Optional[DNSRecord]]]:
+    """
+    Core worker pool. Yields (candidate index, DNSRecord) in completion order,
+    numbering candidates from `start`.
+
+    Forward lookups never wait on PTRs: with do_reverse each record is
+    handed to a _PTRStage task and emitted once its (shared) PTR lookup
+    finishes, so a slow reverse zone only delays the records behind it.
+
+    With report_done, an (index, None) marker follows the last record of
+    every candidate (or stands alone if it had none), so callers can tell
+    exactly which candidates are finished.
+
+    `candidates` may also be a DomainScheduler, which then decides (and
+    numbers) what each worker picks up next.
+
+    `types` (some of A, AAAA, CNAME) switches from plain A lookups to a
+    ChainResolver. Wildcard filtering then looks at the A answers only.
+    """
+    scheduler = candidates if isinstance(candidates, DomainScheduler) else None
+    numbered = enumerate(candidates, start) if scheduler is None else None
+    results: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency) * 4)
+    done = object()
+    stage = None
+    if do_reverse:
+        stage = _PTRStage(concurrency, resolver, transport, cache, stats=stats)
+    chains = None
+    if types:
+        chains = ChainResolver(types, resolver, transport, cache, stats=stats)
+    emitters = set()
+    outstanding: Dict[int, int] = {}  # index -> records still waiting on PTRs
+
+    def record(fqdn: str, hit: Tuple[str, str, List[str]], ptrs: List[str]) -> DNSRecord:
+        rtype, value, chain = hit
+        return DNSRecord(fqdn=fqdn, ip=value, ptrs=ptrs, rtype=rtype, chain=tuple(chain))
+
+    async def emit(index: int, fqdn: str, hit: Tuple[str, str, List[str]]) -> None:
+        ptrs = await stage.ptrs(hit[1]) if hit[0] in ADDRESS_TYPES else []
+        await results.put((index, record(fqdn, hit, ptrs)))
+        outstanding[index] -= 1
+        if not outstanding[index]:
+            del outstanding[index]
+            if report_done:
+                await results.put((index, None))
+
+    async def worker() -> None:
+        while True:
+            # All workers share one iterator; nothing awaits between next()
+            # calls so no two workers can pick up the same candidate.
+            if scheduler is None:
+                item = next(numbered, None)
+            else:
+                item = await scheduler.take()
+            if item is None:
+                return
+            index, fqdn = item
+            try:
+                if chains is None:
+                    ips = await resolve_a_async(
+                        fqdn,
+                        resolver=resolver,
+                        transport=transport,
+                        cache=cache,
+                        stats=stats,
+                    )
+                    hits = [("A", ip, []) for ip in ips]
+                else:
+                    hits = await chains.resolve(fqdn)
+                    ips = [value for rtype, value, _ in hits if rtype == "A"]
+                if wildcards is not None and await wildcards.is_wildcard_async(
+                    fqdn, ips, resolver=resolver, transport=transport
+                ):
+                    hits = []
+            finally:
+                if scheduler is not None:
+                    await scheduler.release(index)
+
+            if stage is None or not hits:
+                for hit in hits:
+                    await results.put((index, record(fqdn, hit, [])))
+                if report_done:
+                    await results.put((index, None))
+                continue
+
+            outstanding[index] = len(hits)
+            for hit in hits:
+                task = asyncio.ensure_future(emit(index, fqdn, hit))
+                emitters.add(task)
+                task.add_done_callback(emitters.discard)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+
+    async def finish() -> None:
+        try:
+            await asyncio.gather(*workers)
+            while emitters:
+                await asyncio.gather(*list(emitters))
+        finally:
+            await results.put(done)
+
+    finisher = asyncio.create_task(finish())
+    try:
+        while True:
+            item = await results.get()
+            if item is done:
+                break
+            yield item
+        await finisher  # re-raise anything a worker died with
+    finally:
+        for task in workers + list(emitters):
+            task.cancel()
+        finisher.cancel()
+        if stage is not None:
+            stage.cancel()
+        if chains is not None:
+            chains.cancel()
+
+
+async def iter_subdomain_search_async(
+    domain: str,
+    wordlist: Iterable[str],
+    nums: bool = True,
+    rules: Optional[List[MutationRule]] = None,
+    dedupe: Optional[BloomFilter] = None,
+    do_reverse: bool = True,
+    concurrency: int = 100,
+    timeout: float = 2.0,
+    nameserver: Optional[str] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+    wildcards: Optional[WildcardFilter] = None,
+    types: Optional[Tuple[str, ...]] = None,
+    checkpoint: Optional["Checkpoint"] = None,
+) -> AsyncIterator[DNSRecord]:
+    """
+    Async generator version of subdomain_search_async(): yields each
+    DNSRecord the moment it resolves (completion order, not wordlist order).
 
+    With a Checkpoint, candidates it already covers are skipped and
+    progress is recorded as candidates finish (records found before the
+    checkpoint are not yielded again; see Checkpoint.records).
+    """
+    resolver = make_async_resolver(timeout, nameserver=nameserver)
+    candidates = iter_candidates(domain, wordlist, nums=nums, rules=rules, dedupe=dedupe)
+    start = 0
+    if checkpoint is not None:
+        start = checkpoint.cursor
+        candidates = itertools.islice(candidates, start, None)
 
-# ---------- (d) Reverse DNS helper ---------- #
+    async for index, rec in _search_indexed_async(
+        candidates,
+        do_reverse,
+        concurrency,
+        resolver,
+        transport,
+        cache,
+        wildcards,
+        start=start,
+        report_done=checkpoint is not None,
+        stats=stats,
+        types=types,
+    ):
+        if rec is None:
+            checkpoint.mark_done(index)
+            continue
+        if checkpoint is not None:
+            checkpoint.add_record(index, rec)
+        yield rec
 
-def reverse_dns(ip: str) -> List[str]:
-    """
-    Return PTR/hostnames for an IP address.
 
-    Equivalent to your reverseDNS(ip) sketch.
+async def subdomain_search_async(
+    domain: str,
+    wordlist: Iterable[str],
+    nums: bool = True,
+    rules: Optional[List[MutationRule]] = None,
+    dedupe: Optional[BloomFilter] = None,
+    do_reverse: bool = True,
+    concurrency: int = 100,
+    timeout: float = 2.0,
+    nameserver: Optional[str] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+    wildcards: Optional[WildcardFilter] = None,
+    types: Optional[Tuple[str, ...]] = None,
+) -> List[DNSRecord]:
     """
-    try:
-        name, aliases, _ = socket.gethostbyaddr(ip)
-        results = [name]
-        results.extend(aliases)
-        return results
-    except (socket.herror, socket.gaierror, TimeoutError):
-        return []
+    Concurrent subdomain_search(): at most `concurrency` names are in flight,
+    each lookup gives up after `timeout` seconds.
 
+    Candidates are pulled lazily from the wordlist, so memory stays flat no
+    matter how long it is. Results come back in the same order as the
+    serial version.
 
-# ---------- (c) Single DNS A lookup ---------- #
+    Pass a DNSTransport to skip dns.asyncresolver and pipeline everything
+    over one socket (the transport's own timeout then applies).
+
+    Reverse lookups run as a separate phase once forward resolution is
+    done, one query per unique IP (see attach_ptrs_async).
 
-def resolve_a(name: str) -> List[str]:
+    `types` (e.g. ("A", "AAAA", "CNAME")) also finds IPv6 and CNAME-fronted
+    hosts; see ChainResolver.
     """
-    Resolve A records for a hostname, return list of IP strings.
+    return await search_candidates_async(
+        iter_candidates(domain, wordlist, nums=nums, rules=rules, dedupe=dedupe),
+        do_reverse=do_reverse,
+        concurrency=concurrency,
+        timeout=timeout,
+        nameserver=nameserver,
+        transport=transport,
+        cache=cache,
+        stats=stats,
+        wildcards=wildcards,
+        types=types,
+    )
+
+
+async def search_candidates_async(
+    candidates: Iterable[str],
+    do_reverse: bool = True,
+    concurrency: int = 100,
+    timeout: float = 2.0,
+    nameserver: Optional[str] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+    wildcards: Optional[WildcardFilter] = None,
+    types: Optional[Tuple[str, ...]] = None,
+    resolver: Optional[dns.asyncresolver.Resolver] = None,
+) -> List[DNSRecord]:
     """
-    try:
-        answers = dns.resolver.resolve(name, "A")
-        return [rdata.to_text() for rdata in answers]
-    except (
-        dns.resolver.NXDOMAIN,
-        dns.resolver.NoAnswer,
-        dns.resolver.NoNameservers,
-        dns.exception.Timeout,
-        dns.resolver.LifetimeTimeout,
+    subdomain_search_async() for an already generated list of FQDNs.
+    Results are in candidate order. A ready-made `resolver` overrides
+    `timeout` / `nameserver`.
+    """
+    resolver = resolver or make_async_resolver(timeout, nameserver=nameserver)
+    found: List[Tuple[int, DNSRecord]] = []
+    async for item in _search_indexed_async(
+        candidates,
+        False,
+        concurrency,
+        resolver,
+        transport,
+        cache,
+        wildcards,
+        stats=stats,
+        types=types,
     ):
-        return []
+        found.append(item)
+
+    found.sort(key=lambda item: item[0])
+    records = [rec for _, rec in found]
+    if do_reverse:
+        await attach_ptrs_async(
+            records,
+            concurrency=concurrency,
+            resolver=resolver,
+            transport=transport,
+            cache=cache,
+            stats=stats,
+        )
+    return records
+
+
+# ---------- (h) Output writers ---------- #
+
+OUTPUT_FORMATS = ("table", "ndjson", "csv")
 
 
-def dns_request(name: str, do_reverse: bool = True) -> List[Tuple[str, List[str]]]:
+class RecordWriter:
     """
-    Perform DNS request for A records and optional reverse DNS.
-    Returns list of (ip, [ptr_names]) tuples.
+    Writes DNSRecords one line at a time and flushes after each, so output
+    can be piped into other tools while a long run is still going.
+
+    With `tagged`, every line also carries the record's apex domain (a
+    leading column in table/CSV, a "domain" key in NDJSON). With `typed`,
+    it carries the record type and CNAME chain as well.
     """
-    ips = resolve_a(name)
-    results: List[Tuple[str, List[str]]] = []
 
-    for ip in ips:
-        ptrs = reverse_dns(ip) if do_reverse else []
-        results.append((ip, ptrs))
+    def __init__(
+        self,
+        stream: TextIO,
+        fmt: str = "table",
+        tagged: bool = False,
+        typed: bool = False,
+    ) -> None:
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"unknown output format: {fmt!r}")
+        self.stream = stream
+        self.fmt = fmt
+        self.tagged = tagged
+        self.typed = typed
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.writer(stream)
+            self._csv.writerow(self._row("domain", "fqdn", "ip", "ptrs", "rtype", "chain"))
 
-    return results
+    def _row(
+        self, domain: Any, fqdn: str, ip: str, ptrs: str, rtype: str, chain: str
+    ) -> list:
+        row = [fqdn, ip, ptrs]
+        if self.typed:
+            row[1:1] = [rtype]
+            row.append(chain)
+        return [domain] + row if self.tagged else row
 
+    def write(self, rec: DNSRecord) -> None:
+        self.write_fields(rec.fqdn, rec.ip, rec.ptrs, rec.domain, rec.rtype, rec.chain)
 
-# ---------- Result structure ---------- #
+    def write_fields(
+        self,
+        fqdn: str,
+        ip: str,
+        ptrs: List[str],
+        domain: Optional[str] = None,
+        rtype: str = "A",
+        chain: Sequence[str] = (),
+    ) -> None:
+        """
+        write() for callers that hold the fields rather than a DNSRecord
+        (RecordTable.export()).
+        """
+        if self.fmt == "ndjson":
+            row: Dict[str, Any] = {"fqdn": fqdn, "ip": ip, "ptrs": list(ptrs)}
+            if self.tagged:
+                row["domain"] = domain
+            if self.typed:
+                row["rtype"] = rtype
+                row["chain"] = list(chain)
+            self.stream.write(json.dumps(row) + "\n")
+        elif self.fmt == "csv":
+            self._csv.writerow(
+                self._row(domain, fqdn, ip, ";".join(ptrs), rtype, ";".join(chain))
+            )
+        else:
+            line = f"{fqdn:40} {ip:16}"
+            if self.typed:
+                line = f"{fqdn:40} {rtype:5} {ip:16}"
+            if ptrs:
+                line += f" PTR: {', '.join(ptrs)}"
+            if self.typed and chain:
+                line += f" via {' -> '.join(chain)}"
+            if self.tagged:
+                line = f"{domain:24} {line}"
+            self.stream.write(line + "\n")
+        self.stream.flush()
 
-@dataclass
-class DNSRecord:
-    fqdn: str
-    ip: str
-    ptrs: List[str]
 
+# ---------- (r) Columnar result table ---------- #
 
-# ---------- (b) SubdomainSearch() ---------- #
+class RecordTable:
+    """
+    Compact in-memory container for large result sets (sorting, dedupe,
+    diffing) at a small fraction of the cost of a list of DNSRecords.
 
-def subdomain_search(
+    Rows are kept in parallel arrays: addresses packed to 16 bytes, the
+    record type as one byte, and everything textual (FQDN, CNAME target,
+    apex, PTR list, chain) as a 4-byte id into one shared UTF-8 blob.
+    Recently seen strings are interned, so the PTR list of an address that
+    many names point at, or the apex shared by every row, is stored once.
+
+    Iterating yields DNSRecords one at a time; export() never builds
+    them. sort() and dedupe() work on an array of row indices, holding
+    bytes only for each distinct name and for the rows sharing one name.
+    """
+
+    INTERN = 65_536  # recently used strings remembered for sharing
+
+    def __init__(self, records: Iterable[DNSRecord] = ()) -> None:
+        self._blob = bytearray()
+        self._offsets = array("Q", [0, 0])  # string 0 is "" / None / []
+        self._intern: OrderedDict = OrderedDict()
+        self._fqdn = array("I")
+        self._value = array("I")  # string id; 0 means "see _addr"
+        self._ptrs = array("I")
+        self._chain = array("I")
+        self._domain = array("I")
+        self._rtype = array("B")
+        self._addr = bytearray()
+        self.extend(records)
+
+    # strings
+
+    def _string_id(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        sid = self._intern.get(text)
+        if sid is not None:
+            self._intern.move_to_end(text)
+            return sid
+        self._blob += text.encode("utf-8")
+        self._offsets.append(len(self._blob))
+        sid = len(self._offsets) - 2
+        self._intern[text] = sid
+        if len(self._intern) > self.INTERN:
+            self._intern.popitem(last=False)
+        return sid
+
+    def _raw(self, sid: int) -> bytes:
+        return bytes(self._blob[self._offsets[sid] : self._offsets[sid + 1]])
+
+    def _string(self, sid: int) -> str:
+        return self._raw(sid).decode("utf-8")
+
+    def _list(self, sid: int) -> List[str]:
+        return self._string(sid).split("\0") if sid else []
+
+    # rows
+
+    def __len__(self) -> int:
+        return len(self._fqdn)
+
+    def append(self, rec: DNSRecord) -> None:
+        rtype = RECORD_TYPES.index(rec.rtype)
+        packed = None
+        if rec.rtype in ADDRESS_TYPES:
+            try:
+                packed = ipaddress.ip_address(rec.ip).packed
+            except ValueError:
+                pass
+            if packed and len(packed) != (4 if rec.rtype == "A" else 16):
+                packed = None  # odd answer; keep it as text
+        self._fqdn.append(self._string_id(rec.fqdn))
+        self._value.append(0 if packed else self._string_id(rec.ip))
+        self._ptrs.append(self._string_id("\0".join(rec.ptrs)))
+        self._chain.append(self._string_id("\0".join(rec.chain)))
+        self._domain.append(self._string_id(rec.domain))
+        self._rtype.append(rtype)
+        self._addr += (packed or b"").rjust(16, b"\0")
+
+    def extend(self, records: Iterable[DNSRecord]) -> None:
+        for rec in records:
+            self.append(rec)
+
+    def _ip(self, i: int) -> str:
+        if self._value[i]:
+            return self._string(self._value[i])
+        packed = bytes(self._addr[i * 16 : i * 16 + 16])
+        if RECORD_TYPES[self._rtype[i]] == "A":
+            packed = packed[12:]
+        return str(ipaddress.ip_address(packed))
+
+    def fields(self, i: int) -> Tuple[Any, ...]:
+        """
+        Row i as (fqdn, ip, ptrs, domain, rtype, chain).
+        """
+        return (
+            self._string(self._fqdn[i]),
+            self._ip(i),
+            self._list(self._ptrs[i]),
+            self._string(self._domain[i]) if self._domain[i] else None,
+            RECORD_TYPES[self._rtype[i]],
+            self._list(self._chain[i]),
+        )
+
+    def __getitem__(self, i: int) -> DNSRecord:
+        fqdn, ip, ptrs, domain, rtype, chain = self.fields(i)
+        return DNSRecord(fqdn, ip, ptrs, domain=domain, rtype=rtype, chain=tuple(chain))
+
+    def __iter__(self) -> Iterator[DNSRecord]:
+        for i in range(len(self)):
+            yield self[i]
+
+    # bulk operations
+
+    def _tail(self, i: int) -> Tuple[int, bytes]:
+        # what orders rows within one name: type, then address or target
+        # (packed rows have value 0, text rows an all-zero address)
+        return self._rtype[i], bytes(self._addr[i * 16 : i * 16 + 16]) + self._raw(self._value[i])
+
+    def _name_ranks(self) -> Tuple[array, int]:
+        """
+        Rank of every string id used as an FQDN, in UTF-8 (code point)
+        order; the same name stored under two ids gets one rank. Only the
+        distinct names are ever held as bytes, never one key per row.
+        """
+        ranks = array("I", bytes(4 * (len(self._offsets) - 1)))
+        sids = list(set(self._fqdn))
+        sids.sort(key=self._raw)
+        rank, previous = -1, None
+        for sid in sids:
+            raw = self._raw(sid)
+            if raw != previous:
+                rank, previous = rank + 1, raw
+            ranks[sid] = rank
+        return ranks, rank + 1
+
+    def _groups(self) -> Iterator[array]:
+        """
+        Row indices grouped by FQDN, groups in name order and rows in
+        table order within each: a counting sort of one index array.
+        """
+        ranks, count = self._name_ranks()
+        starts = array("I", bytes(4 * (count + 1)))
+        for sid in self._fqdn:
+            starts[ranks[sid] + 1] += 1
+        for r in range(count):
+            starts[r + 1] += starts[r]
+        rows = array("I", bytes(4 * len(self)))
+        fill = array("I", starts)
+        for i, sid in enumerate(self._fqdn):
+            r = ranks[sid]
+            rows[fill[r]] = i
+            fill[r] += 1
+        del ranks, fill
+        for r in range(count):
+            yield rows[starts[r] : starts[r + 1]]
+
+    def _reorder(self, rows: array) -> None:
+        for name in ("_fqdn", "_value", "_ptrs", "_chain", "_domain", "_rtype"):
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, (column[i] for i in rows)))
+        addr, self._addr = self._addr, bytearray()
+        for i in rows:
+            self._addr += addr[i * 16 : i * 16 + 16]
+
+    def sort(self) -> None:
+        """
+        Order rows by FQDN, then record type, then address / target.
+        """
+        order = array("I")
+        for group in self._groups():
+            if len(group) > 1:
+                group = sorted(group, key=self._tail)
+            order.extend(group)
+        self._reorder(order)
+
+    def dedupe(self) -> int:
+        """
+        Drop repeated (fqdn, rtype, ip) rows, keeping the first. Returns
+        how many were dropped.
+        """
+        drop = bytearray(len(self))
+        for group in self._groups():
+            if len(group) > 1:
+                seen = set()
+                for i in group:
+                    tail = self._tail(i)
+                    if tail in seen:
+                        drop[i] = 1
+                    else:
+                        seen.add(tail)
+        dropped = drop.count(1)
+        if dropped:
+            self._reorder(array("I", (i for i in range(len(self)) if not drop[i])))
+        return dropped
+
+    def export(self, writer: "RecordWriter") -> None:
+        for i in range(len(self)):
+            writer.write_fields(*self.fields(i))
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory held by the columns, the string blob and the
+        intern table.
+        """
+        columns = (self._fqdn, self._value, self._ptrs, self._chain, self._domain)
+        return (
+            len(self._blob)
+            + sys.getsizeof(self._intern)
+            + sum(sys.getsizeof(text) + sys.getsizeof(sid) for text, sid in self._intern.items())
+            + self._offsets.itemsize * len(self._offsets)
+            + sum(c.itemsize * len(c) for c in columns)
+            + len(self._rtype)
+            + len(self._addr)
+        )
+
+
+# ---------- (j) Multi-process sharding ---------- #
+
+# Per-process state for shard workers, set up once by _init_shard_worker().
+_shard_state: Dict[str, Any] = {}
+
+
+def _init_shard_worker(options: Dict[str, Any]) -> None:
+    # Ctrl-C is the parent's to handle: a worker killed mid-task can leave
+    # the pool's shutdown waiting on it forever
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cache = ResolverCache(
+        max_entries=options.get("cache_size", 100_000),
+        path=options.get("cache_path"),
+    )
+    cache.load()  # read-only in workers; only the parent ever saves
+    transport = None
+    if options.get("resolvers"):
+        transport = ResolverPool(
+            options["resolvers"], timeout=options.get("timeout", 2.0)
+        )
+    elif options.get("pipelined"):
+        transport = DNSTransport(
+            options.get("nameserver"), timeout=options.get("timeout", 2.0)
+        )
+    wildcards = WildcardFilter() if options.get("filter_wildcards") else None
+    _shard_state.update(
+        options=options, cache=cache, transport=transport, wildcards=wildcards
+    )
+
+
+def _search_shard(candidates: List[str]) -> Tuple[List[DNSRecord], Dict[str, Any]]:
+    """
+    Run one chunk of candidate FQDNs through the async engine inside a
+    pool worker. Returns the records plus a QueryStats snapshot for the
+    chunk, which the parent merges into its own counters.
+    """
+    options = _shard_state["options"]
+    stats = QueryStats()
+    records = asyncio.run(
+        search_candidates_async(
+            candidates,
+            do_reverse=options.get("do_reverse", True),
+            concurrency=options.get("concurrency", 100),
+            timeout=options.get("timeout", 2.0),
+            nameserver=options.get("nameserver"),
+            transport=_shard_state["transport"],
+            cache=_shard_state["cache"],
+            stats=stats,
+            wildcards=_shard_state["wildcards"],
+            types=options.get("types"),
+        )
+    )
+    return records, stats.snapshot()
+
+
+def _chunked(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_subdomain_search_sharded(
     domain: str,
     wordlist: Iterable[str],
+    workers: int = 0,
+    chunk_size: int = 1000,
     nums: bool = True,
+    rules: Optional[List[MutationRule]] = None,
+    dedupe: Optional[BloomFilter] = None,
     do_reverse: bool = True,
-) -> List[DNSRecord]:
+    concurrency: int = 100,
+    timeout: float = 2.0,
+    nameserver: Optional[str] = None,
+    pipelined: bool = False,
+    resolvers: Optional[List[str]] = None,
+    cache_path: Optional[str] = None,
+    cache_size: int = 100_000,
+    filter_wildcards: bool = False,
+    checkpoint: Optional["Checkpoint"] = None,
+    stats: Optional[QueryStats] = None,
+    types: Optional[Tuple[str, ...]] = None,
+) -> Iterator[DNSRecord]:
     """
-    Try <word>.<domain> and optionally <word><0-9>.<domain>.
+    Spread the wordlist over a process pool so packet parsing and record
+    building use every core. Candidates are generated (and deduped) here,
+    then each worker runs its own async resolver loop (and its own
+    transport/cache) over contiguous chunks of `chunk_size` candidates.
 
-    This is your SubdomainSearch(domain, dictionary, nums).
-    Returns a list of DNSRecord objects for everything that resolves.
+    Results are yielded in wordlist order, chunk by chunk, with duplicate
+    (fqdn, ip) pairs dropped. Only a few chunks per worker are in flight at
+    a time, so the wordlist is never fully materialised.
+
+    Worker counters reach `stats` a chunk at a time, as chunks are drained
+    (so live in-flight numbers are not available in this mode).
     """
-    records: List[DNSRecord] = []
+    workers = workers or os.cpu_count() or 1
+    options = dict(
+        do_reverse=do_reverse,
+        concurrency=concurrency,
+        timeout=timeout,
+        nameserver=nameserver,
+        pipelined=pipelined,
+        resolvers=resolvers,
+        cache_path=cache_path,
+        cache_size=cache_size,
+        filter_wildcards=filter_wildcards,
+        types=types,
+    )
+    candidates = iter_candidates(domain, wordlist, nums=nums, rules=rules, dedupe=dedupe)
+    start = 0
+    if checkpoint is not None:
+        start = checkpoint.cursor
+        candidates = itertools.islice(candidates, start, None)
+    chunks = _chunked(candidates, chunk_size)
+    seen = set()
 
-    for word in wordlist:
-        word = word.strip()
-        if not word:
-            continue
+    def drain(first: int, size: int, future) -> Iterator[DNSRecord]:
+        records, snapshot = future.result()
+        if stats is not None:
+            stats.merge(snapshot)
+        for rec in records:
+            if (rec.fqdn, rec.rtype, rec.ip) in seen:
+                continue
+            seen.add((rec.fqdn, rec.rtype, rec.ip))
+            if checkpoint is not None:
+                checkpoint.add_record(first, rec)
+            yield rec
+        if checkpoint is not None:
+            for index in range(first, first + size):
+                checkpoint.mark_done(index)
 
-        # base word: word.domain
-        fqdn = f"{word}.{domain}"
-        for ip, ptrs in dns_request(fqdn, do_reverse=do_reverse):
-            records.append(DNSRecord(fqdn=fqdn, ip=ip, ptrs=ptrs))
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_shard_worker,
+        initargs=(options,),
+    )
+    try:
+        window: deque = deque()
+        for chunk in chunks:
+            window.append((start, len(chunk), pool.submit(_search_shard, chunk)))
+            start += len(chunk)
+            if len(window) < workers * 2:
+                continue
+            yield from drain(*window.popleft())
+        while window:
+            yield from drain(*window.popleft())
+    except BaseException as e:
+        # on Ctrl-C (or a consumer that stops early) drop the queued
+        # chunks; exit then only waits for the few already running
+        interrupted = isinstance(e, (KeyboardInterrupt, GeneratorExit))
+        pool.shutdown(wait=not interrupted, cancel_futures=interrupted)
+        raise
+    pool.shutdown()
 
-        # optional numeric variants: word0.domain ... word9.domain
-        if nums:
-            for i in range(0, 10):
-                label = f"{word}{i}"
-                fqdn_num = f"{label}.{domain}"
-                for ip, ptrs in dns_request(fqdn_num, do_reverse=do_reverse):
-                    records.append(DNSRecord(fqdn=fqdn_num, ip=ip, ptrs=ptrs))
 
-    return records
+# ---------- (m) Checkpoint / resume ---------- #
+
+class Checkpoint:
+    """
+    Periodically saved progress of one enumeration run.
+
+    `cursor` is the number of candidates (in generation order) that are
+    completely finished; `records` holds every DNSRecord found among them.
+    Candidates finish out of order under concurrency, so finished indices
+    past the cursor are held back until the gap below them closes, along
+    with their records. Only what is below the cursor is ever written, so a
+    resumed run re-tries at most the handful of candidates that were in
+    flight when it died.
+
+    `key` identifies the candidate stream (domain, wordlist, mutation
+    options); resuming with a different key is refused because the cursor
+    would point at the wrong candidates.
+
+    The state file holds only the key, the cursor and a record count. The
+    records themselves go to `<path>.records` (NDJSON), and each save
+    appends just the ones found since the previous save, so a save costs
+    the same an hour into a run as it did at the start.
+    """
+
+    def __init__(self, path: str, key: Dict[str, Any], interval: float = 30.0) -> None:
+        self.path = path
+        self.key = key
+        self.interval = interval
+        self.cursor = 0
+        self.records = RecordTable()  # can grow to millions on a long run
+        self.complete = False
+        self._finished = set()
+        self._held: Dict[int, List[DNSRecord]] = {}
+        self._last_save = time.monotonic()
+        self._saved = 0      # leading records already in records_path
+        self._fresh = True   # records_path not yet started over by this run
+
+    @property
+    def records_path(self) -> str:
+        return f"{self.path}.records"
+
+    @classmethod
+    def resume(cls, path: str, key: Dict[str, Any], interval: float = 30.0) -> "Checkpoint":
+        """
+        Load the state file at `path`. Raises ValueError if it belongs to a
+        different run.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("key") != key:
+            raise ValueError(
+                f"checkpoint {path} was written for a different run: {state.get('key')}"
+            )
+        checkpoint = cls(path, key, interval)
+        checkpoint.cursor = state["cursor"]
+        if isinstance(state["records"], list):  # version 1: records inline
+            checkpoint.records = RecordTable(DNSRecord(**rec) for rec in state["records"])
+        else:
+            checkpoint._load_records(state["records"])
+        checkpoint.complete = state.get("complete", False)
+        return checkpoint
+
+    def _load_records(self, count: int) -> None:
+        """
+        Read the first `count` records of records_path and cut off anything
+        after them (appended before a crash, but never made part of a save).
+        """
+        self.records = RecordTable()
+        if count:
+            try:
+                f = open(self.records_path, "r+b")
+            except FileNotFoundError:
+                raise ValueError(f"checkpoint records {self.records_path} are missing") from None
+            with f:
+                for _ in range(count):
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        raise ValueError(
+                            f"checkpoint records {self.records_path} hold fewer than {count}"
+                        )
+                    self.records.append(DNSRecord(**json.loads(line)))
+                f.truncate(f.tell())
+        self._saved = count
+        self._fresh = count == 0
+
+    def add_record(self, index: int, rec: DNSRecord) -> None:
+        if index < self.cursor:
+            self.records.append(rec)
+        else:
+            self._held.setdefault(index, []).append(rec)
+
+    def mark_done(self, index: int) -> None:
+        self._finished.add(index)
+        while self.cursor in self._finished:
+            self._finished.discard(self.cursor)
+            self.records.extend(self._held.pop(self.cursor, ()))
+            self.cursor += 1
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def save(self, complete: bool = False) -> None:
+        """
+        Append the records found since the last save to records_path, then
+        atomically replace the state file (write temp, fsync, rename). The
+        state file only counts records once they are on disk.
+        """
+        self.complete = complete
+        with open(self.records_path, "w" if self._fresh else "a", encoding="utf-8") as f:
+            for i in range(self._saved, len(self.records)):
+                f.write(json.dumps(asdict(self.records[i])) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._saved = len(self.records)
+        self._fresh = False
+        state = {
+            "version": 2,
+            "key": self.key,
+            "cursor": self.cursor,
+            "complete": complete,
+            "saved_at": time.time(),
+            "records": self._saved,
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._last_save = time.monotonic()
+
+
+# ---------- (o) SQLite result store ---------- #
+
+RESULT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    domain   TEXT NOT NULL,
+    started  REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS records (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    domain TEXT NOT NULL,
+    fqdn   TEXT NOT NULL,
+    ip     TEXT NOT NULL,
+    ptrs   TEXT NOT NULL,
+    rtype  TEXT NOT NULL DEFAULT 'A',
+    chain  TEXT NOT NULL DEFAULT '[]',
+    UNIQUE (run_id, fqdn, ip)
+);
+CREATE INDEX IF NOT EXISTS records_domain ON records (domain, run_id);
+CREATE INDEX IF NOT EXISTS records_fqdn ON records (fqdn);
+CREATE INDEX IF NOT EXISTS records_ip ON records (ip);
+CREATE INDEX IF NOT EXISTS runs_domain ON runs (domain, id);
+"""
+
+
+class ResultStore:
+    """
+    SQLite sink for DNSRecords, one row per (run, fqdn, ip), indexed by
+    domain, FQDN, IP and run ID so runs can be compared without
+    re-parsing text output.
+
+    Rows are buffered and inserted `batch_size` at a time, one transaction
+    per batch; call flush() (or close()) to push out the remainder.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(RESULT_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(records)")}
+        with self.conn:  # databases written before rtype / chain existed
+            if "rtype" not in columns:
+                self.conn.execute(
+                    "ALTER TABLE records ADD COLUMN rtype TEXT NOT NULL DEFAULT 'A'"
+                )
+            if "chain" not in columns:
+                self.conn.execute(
+                    "ALTER TABLE records ADD COLUMN chain TEXT NOT NULL DEFAULT '[]'"
+                )
+        self.run_id: Optional[int] = None
+        self.domain: Optional[str] = None
+        self._pending: List[Tuple[Any, ...]] = []
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def begin_run(self, domain: str) -> int:
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (domain, started) VALUES (?, ?)",
+                (domain, time.time()),
+            )
+        self.run_id = cur.lastrowid
+        self.domain = domain
+        return self.run_id
+
+    def add(self, rec: DNSRecord) -> None:
+        if self.run_id is None:
+            raise RuntimeError("begin_run() first")
+        self._pending.append(
+            (
+                self.run_id,
+                rec.domain or self.domain,
+                rec.fqdn,
+                rec.ip,
+                json.dumps(rec.ptrs),
+                rec.rtype,
+                json.dumps(rec.chain),
+            )
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO records"
+                " (run_id, domain, fqdn, ip, ptrs, rtype, chain)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._pending,
+            )
+        self._pending = []
+
+    def finish_run(self) -> None:
+        self.flush()
+        with self.conn:
+            self.conn.execute(
+                "UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run_id)
+            )
+
+    def close(self) -> None:
+        self.flush()
+        self.conn.close()
+
+    def resolve_run(self, spec: str, domain: str) -> int:
+        """
+        Turn a --diff-against value into a run ID: a number, or "last" for
+        the most recent finished run of `domain` other than the current one.
+        Raises ValueError if there is no such run.
+        """
+        if spec == "last":
+            row = self.conn.execute(
+                "SELECT id FROM runs WHERE domain = ? AND finished IS NOT NULL"
+                " AND id IS NOT ? ORDER BY id DESC LIMIT 1",
+                (domain, self.run_id),
+            ).fetchone()
+        else:
+            try:
+                run_id = int(spec)
+            except ValueError:
+                raise ValueError(f"run must be a number or 'last', not {spec!r}")
+            row = self.conn.execute(
+                "SELECT id FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        if row is None:
+            raise ValueError(f"no stored run {spec!r} for {domain} in {self.path}")
+        return row[0]
+
+    def _ips(self, run_id: int, fqdns: List[str]) -> Dict[str, List[str]]:
+        ips: Dict[str, List[str]] = {}
+        for fqdn in fqdns:
+            ips[fqdn] = [
+                ip
+                for (ip,) in self.conn.execute(
+                    "SELECT ip FROM records WHERE run_id = ? AND fqdn = ? ORDER BY ip",
+                    (run_id, fqdn),
+                )
+            ]
+        return ips
+
+    def diff(self, run_id: int, against: int) -> Dict[str, Any]:
+        """
+        Compare two runs host by host. Returns
+        {"new": {fqdn: [ips]}, "vanished": {fqdn: [ips]},
+         "changed": {fqdn: {"old": [ips], "new": [ips]}}}.
+        """
+        self.flush()
+        only_in = (
+            "SELECT DISTINCT a.fqdn FROM records a WHERE a.run_id = ?"
+            " AND NOT EXISTS (SELECT 1 FROM records b"
+            " WHERE b.run_id = ? AND b.fqdn = a.fqdn) ORDER BY a.fqdn"
+        )
+        # same host in both runs, but an address one side doesn't have
+        moved = (
+            "SELECT DISTINCT a.fqdn FROM records a WHERE a.run_id = ?"
+            " AND EXISTS (SELECT 1 FROM records b"
+            " WHERE b.run_id = ? AND b.fqdn = a.fqdn)"
+            " AND NOT EXISTS (SELECT 1 FROM records b"
+            " WHERE b.run_id = ? AND b.fqdn = a.fqdn AND b.ip = a.ip)"
+        )
+        new = [fqdn for (fqdn,) in self.conn.execute(only_in, (run_id, against))]
+        vanished = [fqdn for (fqdn,) in self.conn.execute(only_in, (against, run_id))]
+        changed = sorted(
+            {fqdn for (fqdn,) in self.conn.execute(moved, (run_id, against, against))}
+            | {fqdn for (fqdn,) in self.conn.execute(moved, (against, run_id, run_id))}
+        )
+        old_ips = self._ips(against, changed)
+        new_ips = self._ips(run_id, changed)
+        return {
+            "new": self._ips(run_id, new),
+            "vanished": self._ips(against, vanished),
+            "changed": {
+                fqdn: {"old": old_ips[fqdn], "new": new_ips[fqdn]} for fqdn in changed
+            },
+        }
+
+
+def print_diff(diff: Dict[str, Any], stream: TextIO = sys.stderr) -> None:
+    for fqdn, ips in diff["new"].items():
+        print(f"+ {fqdn:40} {', '.join(ips)}", file=stream)
+    for fqdn, ips in diff["vanished"].items():
+        print(f"- {fqdn:40} {', '.join(ips)}", file=stream)
+    for fqdn, change in diff["changed"].items():
+        print(
+            f"~ {fqdn:40} {', '.join(change['old'])} -> {', '.join(change['new'])}",
+            file=stream,
+        )
+    print(
+        f"[diff] {len(diff['new'])} new, {len(diff['vanished'])} vanished, "
+        f"{len(diff['changed'])} changed",
+        file=stream,
+    )
+
+
+# ---------- (p) Multi-domain batch ---------- #
+
+class DomainScheduler:
+    """
+    Candidate source for enumerating many domains through one worker pool.
+
+    Domains take turns (round-robin, one candidate each), and no domain may
+    have more than its share of forward lookups in flight: `limit` if
+    given, otherwise concurrency / domains still running. A huge or slow
+    zone therefore can't tie up the whole pool, and as small zones run out
+    their share goes to the ones that are left.
+
+    Used as the `candidates` of _search_indexed_async(); domain_of() maps a
+    candidate index back to its apex.
+    """
+
+    def __init__(
+        self,
+        domains: Iterable[str],
+        wordlist: Iterable[str],
+        concurrency: int,
+        nums: bool = True,
+        rules: Optional[List[MutationRule]] = None,
+        dedupe: Optional[BloomFilter] = None,
+        limit: Optional[int] = None,
+    ) -> None:
+        # `wordlist` is iterated once per domain, so it has to be re-iterable
+        # (a list or WordlistFile, not a generator).
+        self._active: deque = deque(
+            (
+                domain,
+                iter_candidates(domain, wordlist, nums=nums, rules=rules, dedupe=dedupe),
+            )
+            for domain in domains
+        )
+        self.concurrency = max(1, concurrency)
+        self.limit = limit
+        self.inflight: Dict[str, int] = {domain: 0 for domain, _ in self._active}
+        self._domains: Dict[int, str] = {}
+        self._next_index = 0
+        self._ready: Optional[asyncio.Condition] = None
+
+    def _share(self) -> int:
+        if self.limit:
+            return self.limit
+        return max(1, -(-self.concurrency // max(1, len(self._active))))
+
+    def _pick(self) -> Optional[Tuple[int, str]]:
+        for _ in range(len(self._active)):
+            domain, candidates = self._active[0]
+            self._active.rotate(-1)
+            if self.inflight[domain] >= self._share():
+                continue
+            fqdn = next(candidates, None)
+            if fqdn is None:
+                self._active.pop()  # exhausted; it was just rotated to the end
+                continue
+            index = self._next_index
+            self._next_index += 1
+            self.inflight[domain] += 1
+            self._domains[index] = domain
+            return index, fqdn
+        return None
+
+    async def take(self) -> Optional[Tuple[int, str]]:
+        """
+        Next (index, fqdn), waiting while every remaining domain is at its
+        share. None once all domains are exhausted.
+        """
+        if self._ready is None:
+            self._ready = asyncio.Condition()
+        async with self._ready:
+            while self._active:
+                item = self._pick()
+                if item is not None:
+                    return item
+                if self._active:
+                    await self._ready.wait()
+            return None
+
+    async def release(self, index: int) -> None:
+        """
+        Forward lookup for `index` is done; its domain may issue another.
+        """
+        self.inflight[self._domains[index]] -= 1
+        async with self._ready:
+            self._ready.notify_all()
+
+    def domain_of(self, index: int) -> str:
+        return self._domains[index]
+
+    def forget(self, index: int) -> None:
+        self._domains.pop(index, None)
+
+
+async def iter_multi_domain_search_async(
+    domains: Iterable[str],
+    wordlist: Iterable[str],
+    nums: bool = True,
+    rules: Optional[List[MutationRule]] = None,
+    dedupe: Optional[BloomFilter] = None,
+    do_reverse: bool = True,
+    concurrency: int = 100,
+    timeout: float = 2.0,
+    nameserver: Optional[str] = None,
+    transport: Optional[DNSTransport] = None,
+    cache: Optional[ResolverCache] = None,
+    stats: Optional[QueryStats] = None,
+    wildcards: Optional[WildcardFilter] = None,
+    types: Optional[Tuple[str, ...]] = None,
+    per_domain_limit: Optional[int] = None,
+) -> AsyncIterator[DNSRecord]:
+    """
+    iter_subdomain_search_async() over many domains at once: one worker
+    pool, one resolver/transport, one cache, fair turns between domains
+    (see DomainScheduler). Each DNSRecord comes back with .domain set to
+    the apex it was found under. `wordlist` must be re-iterable.
+    """
+    resolver = make_async_resolver(timeout, nameserver=nameserver)
+    scheduler = DomainScheduler(
+        domains,
+        wordlist,
+        concurrency,
+        nums=nums,
+        rules=rules,
+        dedupe=dedupe,
+        limit=per_domain_limit,
+    )
+    async for index, rec in _search_indexed_async(
+        scheduler,
+        do_reverse,
+        concurrency,
+        resolver,
+        transport,
+        cache,
+        wildcards,
+        report_done=True,
+        stats=stats,
+        types=types,
+    ):
+        if rec is None:
+            scheduler.forget(index)
+            continue
+        rec.domain = scheduler.domain_of(index)
+        yield rec
 
 
 # ---------- (a) Wordlist loader ---------- #
@@ -137,6 +2954,23 @@ def load_wordlist(path: str) -> List[str]:
     return words
 
 
+def load_domains(path: str) -> List[str]:
+    """
+    Apex domains from a file, one per line (# comments), duplicates dropped.
+    """
+    domains = (d.rstrip(".").lower() for d in load_wordlist(path))
+    return list(dict.fromkeys(d for d in domains if d))
+
+
+def load_resolvers(spec: str) -> List[str]:
+    """
+    Resolver list from a file (one per line, # comments) or "a,b,c".
+    """
+    if os.path.isfile(spec):
+        return load_wordlist(spec)
+    return [server.strip() for server in spec.split(",") if server.strip()]
+
+
 # ---------- Optional: quick CLI entrypoint ---------- #
 
 def main() -> None:
@@ -147,7 +2981,14 @@ def main() -> None:
     """
     import argparse
     parser = argparse.ArgumentParser(description="DNS exploration / subdomain enum")
-    parser.add_argument("-d", "--domain", required=True, help="Target domain")
+    targets = parser.add_mutually_exclusive_group(required=True)
+    targets.add_argument("-d", "--domain", help="Target domain")
+    targets.add_argument(
+        "--domains-file",
+        metavar="FILE",
+        help="Enumerate every apex domain in FILE (one per line) through one "
+        "shared resolver pool and cache; output is tagged by domain",
+    )
     parser.add_argument(
         "-w", "--wordlist", required=True, help="Subdomain wordlist file"
     )
@@ -161,21 +3002,389 @@ def main() -> None:
         action="store_true",
         help="Disable reverse DNS lookups",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=100,
+        help="Number of DNS queries in flight at once (default: 100, 1 = serial)",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=2.0,
+        help="Per-query timeout in seconds (default: 2.0)",
+    )
+    parser.add_argument(
+        "--nameserver",
+        help="Query this resolver (host or host:port) instead of the system one",
+    )
+    parser.add_argument(
+        "--pipelined",
+        action="store_true",
+        help="Use the single-socket pipelined transport instead of dns.resolver",
+    )
+    parser.add_argument(
+        "--resolvers",
+        metavar="LIST",
+        help="Comma-separated upstream resolvers (or a file of them) to "
+        "load-balance across with adaptive rate control; implies --pipelined",
+    )
+    parser.add_argument(
+        "--cache",
+        metavar="FILE",
+        help="Persist resolver cache to FILE so repeated runs skip answered names",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=100_000,
+        help="Maximum cached answers kept in memory (default: 100000)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="table",
+        help="Output format, streamed as records resolve (default: table)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Write results to this file instead of stdout",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Shard the wordlist across N processes (0 = one per CPU, default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Candidates per shard handed to a worker process (default: 1000)",
+    )
+    parser.add_argument(
+        "--affixes",
+        metavar="FILE",
+        help="Second wordlist glued on as prefixes/suffixes (api -> dev-api, api.dev, ...)",
+    )
+    parser.add_argument(
+        "--affix-separators",
+        default=",-,.",
+        help="Comma-separated joiners for --affixes; empty entry = no joiner "
+        "(default: ',-,.' i.e. none, '-' and '.')",
+    )
+    parser.add_argument(
+        "--no-dedupe",
+        action="store_true",
+        help="Don't drop repeated candidates",
+    )
+    parser.add_argument(
+        "--dedupe-capacity",
+        type=int,
+        default=10_000_000,
+        help="Candidates the dedupe filter is sized for, across all domains "
+        "(default: 10000000)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="Periodically save progress to FILE and results found so far "
+        "to FILE.records",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between checkpoint saves (default: 30)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the run saved in --checkpoint FILE instead of starting over",
+    )
+    parser.add_argument(
+        "--keep-wildcards",
+        action="store_true",
+        help="Report hits that only match a wildcard record (*.domain)",
+    )
+    parser.add_argument(
+        "--types",
+        default="A",
+        help="Record types to look for, comma-separated: A, AAAA, CNAME "
+        "(default: A). CNAME targets are resolved once and shared by aliases",
+    )
+    parser.add_argument(
+        "--per-domain-limit",
+        type=int,
+        metavar="N",
+        help="With --domains-file, max lookups in flight per domain "
+        "(default: concurrency / domains still running)",
+    )
+    parser.add_argument(
+        "--sort",
+        action="store_true",
+        help="Hold results in a compact table and write them sorted and "
+        "deduplicated when the run ends, instead of as they resolve",
+    )
+    parser.add_argument(
+        "--stats",
+        type=float,
+        metavar="SECONDS",
+        help="Print a query stats line to stderr every SECONDS, and a JSON "
+        "summary at the end",
+    )
+    parser.add_argument(
+        "--stats-json",
+        metavar="FILE",
+        help="Write the final query stats summary to FILE as JSON",
+    )
+    parser.add_argument(
+        "--db",
+        metavar="FILE",
+        help="Also store results in this SQLite database, as a new run",
+    )
+    parser.add_argument(
+        "--diff-against",
+        metavar="RUN",
+        help="After the run, list hosts that are new, vanished or changed "
+        "compared to stored run RUN (an ID from --db, or 'last')",
+    )
     args = parser.parse_args()
 
-    words = load_wordlist(args.wordlist)
-    records = subdomain_search(
-        args.domain,
-        words,
-        nums=not args.no_nums,
-        do_reverse=not args.no_reverse,
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint FILE")
+    if args.diff_against and not args.db:
+        parser.error("--diff-against needs --db FILE")
+    try:
+        types = parse_record_types(args.types)
+    except ValueError as e:
+        parser.error(str(e))
+    if types == ("A",):
+        types = None  # plain A lookups, no CNAME probe
+    if args.domains_file:
+        # candidates are handed out dynamically, so there is no stable
+        # cursor to checkpoint, and sharding would split the shared pool
+        if args.checkpoint:
+            parser.error("--checkpoint can't be combined with --domains-file")
+        if args.workers != 1:
+            parser.error("--workers can't be combined with --domains-file")
+        domains = load_domains(args.domains_file)
+        if not domains:
+            parser.error(f"no domains in {args.domains_file}")
+        # runs of a domains file are stored (and diffed) under its path
+        run_label = "@" + os.path.abspath(args.domains_file)
+    else:
+        domains = [args.domain]
+        run_label = args.domain
+
+    store = None
+    against = None
+    if args.db:
+        store = ResultStore(args.db)
+        if args.diff_against:
+            try:
+                against = store.resolve_run(args.diff_against, run_label)
+            except ValueError as e:
+                parser.error(str(e))
+        run_id = store.begin_run(run_label)
+        print(f"[+] Storing results in {args.db} as run {run_id}", file=sys.stderr)
+
+    checkpoint = None
+    if args.checkpoint:
+        # everything that changes the candidate sequence
+        key = {
+            "domain": args.domain,
+            "wordlist": os.path.abspath(args.wordlist),
+            "nums": not args.no_nums,
+            "affixes": os.path.abspath(args.affixes) if args.affixes else None,
+            "affix_separators": args.affix_separators,
+            "dedupe": None if args.no_dedupe else args.dedupe_capacity,
+        }
+        if args.resume and os.path.exists(args.checkpoint):
+            try:
+                checkpoint = Checkpoint.resume(
+                    args.checkpoint, key, args.checkpoint_interval
+                )
+            except ValueError as e:
+                parser.error(str(e))
+        else:
+            checkpoint = Checkpoint(args.checkpoint, key, args.checkpoint_interval)
+
+    cache = ResolverCache(max_entries=args.cache_size, path=args.cache)
+    cache.load()
+
+    resolvers = load_resolvers(args.resolvers) if args.resolvers else None
+
+    transport = None
+    if resolvers:
+        transport = ResolverPool(resolvers, timeout=args.timeout).start()
+    elif args.pipelined:
+        transport = DNSTransport(args.nameserver, timeout=args.timeout).start()
+
+    wildcards = None
+    if not args.keep_wildcards:
+        wildcards = WildcardFilter()
+
+        async def fingerprint_apexes() -> List[FrozenSet[str]]:
+            resolver = make_async_resolver(args.timeout, nameserver=args.nameserver)
+            return await asyncio.gather(
+                *(
+                    wildcards.fingerprint_async(
+                        domain, resolver=resolver, transport=transport
+                    )
+                    for domain in domains
+                )
+            )
+
+        for domain, apex_ips in zip(domains, asyncio.run(fingerprint_apexes())):
+            if apex_ips:
+                print(
+                    f"[!] Wildcard DNS on *.{domain} -> {', '.join(sorted(apex_ips))}"
+                    " (matching answers will be dropped)",
+                    file=sys.stderr,
+                )
+
+    rules: List[MutationRule] = []
+    if args.affixes:
+        rules.append(
+            AffixRule(iter_wordlist(args.affixes), args.affix_separators.split(","))
+        )
+    dedupe = None if args.no_dedupe else BloomFilter(args.dedupe_capacity)
+
+    stats = QueryStats()
+    reporter = StatsReporter(stats, args.stats).start() if args.stats else None
+
+    words = iter_wordlist(args.wordlist)
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    writer = RecordWriter(
+        out, args.format, tagged=bool(args.domains_file), typed=types is not None
     )
 
-    for rec in records:
-        if rec.ptrs:
-            print(f"{rec.fqdn:40} {rec.ip:16} PTR: {', '.join(rec.ptrs)}")
+    table = RecordTable() if args.sort else None
+
+    def emit(rec: DNSRecord) -> None:
+        if table is not None:
+            table.append(rec)
+        else:
+            writer.write(rec)
+        if store is not None:
+            store.add(rec)
+
+    if checkpoint is not None:
+        for rec in checkpoint.records:
+            emit(rec)
+
+    async def stream_async() -> None:
+        async for rec in iter_subdomain_search_async(
+            args.domain,
+            words,
+            nums=not args.no_nums,
+            rules=rules,
+            dedupe=dedupe,
+            do_reverse=not args.no_reverse,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            nameserver=args.nameserver,
+            transport=transport,
+            cache=cache,
+            stats=stats,
+            wildcards=wildcards,
+            checkpoint=checkpoint,
+            types=types,
+        ):
+            emit(rec)
+
+    async def stream_domains_async() -> None:
+        with WordlistFile(args.wordlist) as wordlist:
+            async for rec in iter_multi_domain_search_async(
+                domains,
+                wordlist,
+                nums=not args.no_nums,
+                rules=rules,
+                dedupe=dedupe,
+                do_reverse=not args.no_reverse,
+                concurrency=args.concurrency,
+                timeout=args.timeout,
+                nameserver=args.nameserver,
+                transport=transport,
+                cache=cache,
+                stats=stats,
+                wildcards=wildcards,
+                per_domain_limit=args.per_domain_limit,
+                types=types,
+            ):
+                emit(rec)
+
+    finished = False
+    try:
+        if args.domains_file:
+            asyncio.run(stream_domains_async())
+        elif args.workers != 1:
+            for rec in iter_subdomain_search_sharded(
+                args.domain,
+                words,
+                workers=args.workers,
+                chunk_size=args.chunk_size,
+                nums=not args.no_nums,
+                rules=rules,
+                dedupe=dedupe,
+                do_reverse=not args.no_reverse,
+                concurrency=args.concurrency,
+                timeout=args.timeout,
+                nameserver=args.nameserver,
+                pipelined=args.pipelined,
+                resolvers=resolvers,
+                cache_path=args.cache,
+                cache_size=args.cache_size,
+                filter_wildcards=wildcards is not None,
+                checkpoint=checkpoint,
+                stats=stats,
+                types=types,
+            ):
+                emit(rec)
+        elif args.concurrency <= 1 and types is None:
+            for rec in iter_subdomain_search(
+                args.domain,
+                words,
+                nums=not args.no_nums,
+                rules=rules,
+                dedupe=dedupe,
+                do_reverse=not args.no_reverse,
+                transport=transport,
+                cache=cache,
+                stats=stats,
+                wildcards=wildcards,
+                checkpoint=checkpoint,
+            ):
+                emit(rec)
         else:
-            print(f"{rec.fqdn:40} {rec.ip:16}")
+            asyncio.run(stream_async())
+        finished = True
+        if table is not None:
+            table.dedupe()
+            table.sort()
+            table.export(writer)
+    finally:
+        if checkpoint is not None:
+            checkpoint.save(complete=finished)
+        if transport is not None:
+            transport.close()
+        cache.save()
+        if out is not sys.stdout:
+            out.close()
+        if reporter is not None:
+            reporter.stop()
+            print(json.dumps(stats.summary()), file=sys.stderr)
+        if args.stats_json:
+            with open(args.stats_json, "w", encoding="utf-8") as f:
+                json.dump(stats.summary(), f, indent=2)
+        if store is not None:
+            if finished:
+                store.finish_run()
+                if against is not None:
+                    print_diff(store.diff(store.run_id, against))
+            store.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,376 @@
+"""
+ProtocolTunnelingBench.py
+
+Localhost load generator for the tunneling server.
+
+Starts ProtocolTunnelingServer.py on 127.0.0.1 (a free port, its own
+process), drives it with N concurrent simulated clients and reports
+messages/sec, p50/p99 round-trip latency and the server's CPU use, so
+server-core changes can be compared run to run on the same machine.
+
+--idle holds that many keep-alive connections open and silent for the
+whole run, like C2Clients between flushes. With more of them than server
+workers, the measured clients' latency shows whether idle connections
+tie up workers.
+
+--profile additionally runs C2Server.do_GET in-process under cProfile and
+breaks the per-request time down into base64, event logging, header
+parsing and socket write.
+
+    python3 ProtocolTunnelingBench.py --clients 50 --requests 200 --batch 8
+    python3 ProtocolTunnelingBench.py --workers 4 --idle 16 --clients 4
+"""
+
+import argparse
+import cProfile
+import http.client
+import io
+import json
+import os
+import pstats
+import re
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+import types
+from base64 import b64decode, b64encode
+from dataclasses import asdict, dataclass
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER = os.path.join(HERE, "ProtocolTunnelingServer.py")
+
+# -----------------------------
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def process_cpu(pid):
+    """
+    user+system CPU seconds used so far by `pid` (Linux /proc), or None.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class ServerProcess:
+    """
+    ProtocolTunnelingServer.py in a child process on 127.0.0.1:<free port>.
+
+    The child runs unbuffered (like logging to a terminal) and its output
+    is read and discarded here, so its event log costs what it would in
+    real use without flooding the benchmark's own output.
+    """
+
+    def __init__(self, workers=32, queue=256, keepalive_timeout=15):
+        self.args = [
+            sys.executable, "-u", SERVER,
+            "--host", "127.0.0.1", "--port", "0",
+            "--workers", str(workers),
+            "--queue", str(queue),
+            "--keepalive-timeout", str(keepalive_timeout),
+        ]
+        self.proc = None
+        self.port = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(
+            self.args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        for line in self.proc.stdout:
+            match = re.search(r"listening on port (\d+)", line)
+            if match:
+                self.port = int(match.group(1))
+                break
+        else:
+            raise RuntimeError("server exited before it started listening")
+        threading.Thread(target=self._drain, daemon=True).start()
+        return self
+
+    def _drain(self):
+        for _ in self.proc.stdout:
+            pass
+
+    def cpu(self):
+        return process_cpu(self.proc.pid)
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+@dataclass
+class TunnelBenchResult:
+    clients: int
+    idle: int
+    requests: int
+    messages: int
+    errors: int
+    seconds: float
+    requests_per_s: float
+    messages_per_s: float
+    p50_ms: float
+    p99_ms: float
+    server_cpu_s: float
+    server_cpu_percent: float
+
+
+def _client(port, requests, batch, payload, keepalive, latencies, errors, start):
+    cookie = ".".join([b64encode(payload).decode()] * batch)
+    headers = {"Cookie": cookie}
+    conn = None
+    start.wait()
+    for _ in range(requests):
+        if conn is None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        sent = time.perf_counter()
+        try:
+            conn.request("GET", "/", headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+            if response.status != 200 or len(body.split(b".")) != batch:
+                errors.append(response.status)
+            else:
+                b64decode(body.split(b".")[0])
+                latencies.append(time.perf_counter() - sent)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = None
+            continue
+        if not keepalive or response.will_close:
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+
+
+def _read_reply(conn):
+    try:
+        conn.getresponse().read()
+    except (OSError, http.client.HTTPException):
+        pass
+
+
+def _idle_clients(port, count, payload, settle=2.0):
+    """
+    `count` keep-alive connections that all check in at once and then stay
+    open without sending anything. Waits up to `settle` seconds for the
+    replies: a server that ties a worker to each connection answers only
+    as many as it has workers, and the clients measured next queue behind
+    the rest.
+    """
+    headers = {"Cookie": b64encode(payload).decode()}
+    conns = []
+    for _ in range(count):
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.request("GET", "/", headers=headers)
+        conns.append(conn)
+    readers = [threading.Thread(target=_read_reply, args=(conn,), daemon=True) for conn in conns]
+    for reader in readers:
+        reader.start()
+    deadline = time.monotonic() + settle
+    for reader in readers:
+        reader.join(max(0, deadline - time.monotonic()))
+    return conns
+
+
+def run_benchmark(clients=20, requests=200, batch=1, size=64, keepalive=True,
+                  workers=32, queue=256, idle=0):
+    """
+    `clients` threads each send `requests` GETs carrying `batch` messages of
+    `size` bytes, over one keep-alive connection per client (or a new one
+    per request without `keepalive`, like C2()), while `idle` more
+    keep-alive connections sit open doing nothing.
+    """
+    payload = os.urandom(size // 2).hex().encode()[:size]
+    latencies, errors = [], []
+    start = threading.Event()
+
+    with ServerProcess(workers=workers, queue=queue) as server:
+        idle_conns = _idle_clients(server.port, idle, payload)
+        threads = [
+            threading.Thread(
+                target=_client,
+                args=(server.port, requests, batch, payload, keepalive,
+                      latencies, errors, start),
+                daemon=True,
+            )
+            for _ in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        cpu_before = server.cpu()
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        started = time.perf_counter()
+        start.set()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+        cpu_after = server.cpu()
+        for conn in idle_conns:
+            conn.close()
+
+    if cpu_before is None or cpu_after is None:
+        # no /proc: fall back to what the reaped child used in total
+        after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        server_cpu = (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime)
+    else:
+        server_cpu = cpu_after - cpu_before
+
+    done = len(latencies)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 2)
+
+    return TunnelBenchResult(
+        clients=clients,
+        idle=idle,
+        requests=done,
+        messages=done * batch,
+        errors=len(errors),
+        seconds=round(seconds, 3),
+        requests_per_s=round(done / seconds, 1) if seconds else 0.0,
+        messages_per_s=round(done * batch / seconds, 1) if seconds else 0.0,
+        p50_ms=ms(percentile(latencies, 50)),
+        p99_ms=ms(percentile(latencies, 99)),
+        server_cpu_s=round(server_cpu, 3),
+        server_cpu_percent=round(100 * server_cpu / seconds, 1) if seconds else 0.0,
+    )
+
+# -----------------------------
+
+# (stage, matcher on pstats (file, line, function) keys)
+STAGES = (
+    ("base64", lambda f, fn: f.endswith("base64.py")),
+    ("event log", lambda f, fn: fn == "emit"),
+    ("parse request", lambda f, fn: fn == "parse_request"),
+    ("socket write", lambda f, fn: fn in ("write", "sendall") and "socket" in f),
+)
+
+
+def profile_handler(requests=2000, batch=1, size=64):
+    """
+    Feed `requests` keep-alive GETs through one C2Server over a loopback
+    connection under cProfile, with the event log going to /dev/null. Returns
+    microseconds per request spent in each stage (cumulative, so a stage
+    includes what it calls) plus the handler total.
+    """
+    sys.path.insert(0, HERE)
+    from ProtocolTunnelingServer import C2Server, EventLog
+
+    payload = os.urandom(size // 2).hex().encode()[:size]
+    cookie = ".".join([b64encode(payload).decode()] * batch)
+    raw = f"GET / HTTP/1.1\r\nHost: bench\r\nCookie: {cookie}\r\n\r\n".encode()
+
+    # a real TCP pair: the handler sets TCP_NODELAY, which AF_UNIX refuses
+    with socket.create_server(("127.0.0.1", 0)) as listener:
+        client_sock = socket.create_connection(listener.getsockname())
+        server_sock, _ = listener.accept()
+
+    def feed():
+        client_sock.sendall(raw * requests)
+        client_sock.shutdown(socket.SHUT_WR)
+
+    def drain():
+        while client_sock.recv(65536):
+            pass
+
+    threads = [
+        threading.Thread(target=feed, daemon=True),
+        threading.Thread(target=drain, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    # the handler only needs server.events from its server
+    server = types.SimpleNamespace(events=EventLog(os.devnull))
+    profiler = cProfile.Profile()
+    profiler.enable()
+    C2Server(server_sock, ("127.0.0.1", 0), server)
+    profiler.disable()
+    server.events.close()
+    server_sock.close()
+    for thread in threads:
+        thread.join()
+    client_sock.close()
+
+    stats = pstats.Stats(profiler, stream=io.StringIO()).stats
+    breakdown = {name: 0.0 for name, _ in STAGES}
+    total = 0.0
+    for (filename, _, function), (_, _, _, cumulative, _) in stats.items():
+        if function == "handle_one_request":
+            total = max(total, cumulative)
+        for name, matches in STAGES:
+            if matches(filename, function):
+                breakdown[name] += cumulative
+    breakdown["total"] = total
+    return {name: round(seconds / requests * 1e6, 2) for name, seconds in breakdown.items()}
+
+# -----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Tunneling server load benchmark")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per client")
+    parser.add_argument("--batch", type=int, default=1, help="Messages per request")
+    parser.add_argument("--size", type=int, default=64, help="Message size in bytes")
+    parser.add_argument(
+        "--no-keepalive", action="store_true",
+        help="New connection for every request, like C2()",
+    )
+    parser.add_argument("--workers", type=int, default=32, help="Server worker threads")
+    parser.add_argument("--queue", type=int, default=256, help="Server connection queue")
+    parser.add_argument(
+        "--idle", type=int, default=0,
+        help="Keep-alive connections held open and idle during the run "
+        "(try more than --workers)",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Also profile do_GET in-process and show where the time goes",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    result = asdict(run_benchmark(
+        clients=args.clients,
+        requests=args.requests,
+        batch=args.batch,
+        size=args.size,
+        keepalive=not args.no_keepalive,
+        workers=args.workers,
+        queue=args.queue,
+        idle=args.idle,
+    ))
+    if args.profile:
+        result["handler_us_per_request"] = profile_handler(
+            requests=max(args.requests, 1000), batch=args.batch, size=args.size
+        )
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    for field, value in result.items():
+        if isinstance(value, dict):
+            print(field)
+            for stage, us in value.items():
+                print(f"  {stage:16} {us}")
+        else:
+            print(f"{field:20} {value}")
+
+
+if __name__ == "__main__":
+    main()
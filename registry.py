@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+registry.py - one read-only registry interface for the detectors.
+
+    WinregBackend()  the live registry of this Windows host (winreg)
+    HiveBackend()    collected hive files, parsed offline by regf.py,
+                     on any OS
+
+Both take a root ("HKLM", "HKCU", "HKU", "HKCR") and a backslash path and
+return what winreg would: values as (data, type), missing keys/values as
+FileNotFoundError. A hive file that is missing or can't be read raises
+RegfError instead, so it is never mistaken for an absent key.
+key_last_written() gives a key's last-write time (UTC),
+so callers can skip re-reading keys that have not changed. Detection code
+written against this runs unchanged on a live host or over a directory of
+collected hives.
+
+    registry = HiveBackend.from_files(["NTUSER.DAT", "SOFTWARE"])
+    data, _ = registry.query_value("HKCU", "Environment", "UserInitMprLogonScript")
+"""
+
+import os
+
+from regf import Hive, RegfError, filetime
+
+try:
+    import winreg  # type: ignore[attr-defined]
+except ImportError:
+    winreg = None
+
+ROOTS = ("HKLM", "HKCU", "HKU", "HKCR")
+
+# Where each standard hive file is mounted in the live registry
+HIVE_MOUNTS = {
+    "NTUSER.DAT": "HKCU",
+    "USRCLASS.DAT": r"HKCU\Software\Classes",
+    "SOFTWARE": r"HKLM\SOFTWARE",
+    "SYSTEM": r"HKLM\SYSTEM",
+    "SAM": r"HKLM\SAM",
+    "SECURITY": r"HKLM\SECURITY",
+    "DEFAULT": r"HKU\.DEFAULT",
+}
+
+
+def _join(*parts):
+    return "\\".join(part.strip("\\") for part in parts if part.strip("\\"))
+
+
+class WinregBackend:
+    """The live registry, through winreg (Windows only)."""
+
+    def __init__(self):
+        if winreg is None:
+            raise RuntimeError("winreg is not available; use HiveBackend with collected hives")
+        self._roots = {
+            "HKLM": winreg.HKEY_LOCAL_MACHINE,
+            "HKCU": winreg.HKEY_CURRENT_USER,
+            "HKU": winreg.HKEY_USERS,
+            "HKCR": winreg.HKEY_CLASSES_ROOT,
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def query_value(self, root, path, name):
+        with winreg.OpenKey(self._roots[root], path, 0, winreg.KEY_READ) as key:
+            return winreg.QueryValueEx(key, name)
+
+    def enum_values(self, root, path):
+        """(name, data, type) for every value of the key."""
+        values = []
+        with winreg.OpenKey(self._roots[root], path, 0, winreg.KEY_READ) as key:
+            index = 0
+            while True:
+                try:
+                    values.append(winreg.EnumValue(key, index))
+                except OSError:
+                    break
+                index += 1
+        return values
+
+    def key_last_written(self, root, path):
+        with winreg.OpenKey(self._roots[root], path, 0, winreg.KEY_READ) as key:
+            return filetime(winreg.QueryInfoKey(key)[2])
+
+
+class HiveBackend:
+    """
+    Collected hive files mounted where they live in the registry, e.g.
+    {"HKCU": "NTUSER.DAT", r"HKLM\\SOFTWARE": "SOFTWARE"}. Hives are opened
+    (memory-mapped) on first use; keys under an unmounted path are
+    reported missing, as they would be on a host without that hive.
+    close() unmaps them; the next lookup opens the files again, so a
+    long-lived backend sees hives that were replaced in between.
+    """
+
+    def __init__(self, mounts):
+        self.mounts = {_join(mount).lower(): path for mount, path in mounts.items()}
+        self._hives = {}
+
+    @classmethod
+    def from_files(cls, paths):
+        """Mount standard hive files by file name (NTUSER.DAT, SOFTWARE, ...)."""
+        mounts = {}
+        for path in paths:
+            mount = HIVE_MOUNTS.get(os.path.basename(path).upper())
+            if mount is None:
+                raise ValueError(f"{path}: unknown hive file name")
+            mounts[mount] = path
+        return cls(mounts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for hive in self._hives.values():
+            hive.close()
+        self._hives.clear()
+
+    def _key(self, root, path):
+        full = _join(root, path)
+        folded = full.lower()
+        # longest mount point containing the path
+        for mount in sorted(self.mounts, key=len, reverse=True):
+            if folded == mount or folded.startswith(mount + "\\"):
+                break
+        else:
+            raise FileNotFoundError(f"{full}: no hive mounted for this path")
+        hive = self._hives.get(mount)
+        if hive is None:
+            try:
+                hive = Hive(self.mounts[mount])
+            except OSError as e:
+                # not FileNotFoundError: that would read as "key absent"
+                raise RegfError(f"{self.mounts[mount]}: cannot open hive: {e.strerror or e}") from e
+            self._hives[mount] = hive
+        try:
+            return hive.open(full[len(mount):])
+        except KeyError:
+            raise FileNotFoundError(f"{full}: key not found") from None
+
+    def query_value(self, root, path, name):
+        value = self._key(root, path).value(name)
+        if value is None:
+            raise FileNotFoundError(f"{_join(root, path)}\\{name}: value not found")
+        return value.data, value.type
+
+    def enum_values(self, root, path):
+        """(name, data, type) for every value of the key."""
+        return [(value.name, value.data, value.type) for value in self._key(root, path).values()]
+
+    def key_last_written(self, root, path):
+        return self._key(root, path).last_written
+
+
+def default_backend():
+    """The live registry; only on Windows."""
+    return WinregBackend()